@@ -4,6 +4,8 @@ Video Server API - Main Application
 Provides endpoints for video management, streaming, and thumbnail generation.
 """
 
+import asyncio
+
 from fastapi import FastAPI, HTTPException, Query, Request, BackgroundTasks
 from fastapi.responses import FileResponse, JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
@@ -273,14 +275,17 @@ async def request_video(url: str = Query(..., description="Video URL")):
         # 3. If READY - check file exists and is valid
         if status == VideoStatus.READY:
             # Check if file exists
-            file_path = await storage.find_video_path(video_hash)
+            file_path = await storage.find_video_path(video_hash, video.get('file_ext'))
             
             # If file missing or corrupted - mark as FAILED and restart
-            if not file_path or not file_path.exists():
+            if not file_path:
                 logger.warning(f"File missing for READY video {video_hash}, re-downloading...")
                 
-                # Mark as FAILED first
-                await db.update_status(video_hash, VideoStatus.FAILED)
+                # Mark as FAILED first (counted once, even for concurrent requests)
+                if await db.update_status(
+                    video_hash, VideoStatus.FAILED, from_status=VideoStatus.READY
+                ):
+                    storage.on_delete(video.get('file_size'))
                 await _cleanup_temp_files(video_hash)
                 
                 # Restart download
@@ -318,7 +323,10 @@ async def request_video(url: str = Query(..., description="Video URL")):
                     pass
                 
                 # Mark as FAILED
-                await db.update_status(video_hash, VideoStatus.FAILED)
+                if await db.update_status(
+                    video_hash, VideoStatus.FAILED, from_status=VideoStatus.READY
+                ):
+                    storage.on_delete(video.get('file_size'))
                 await _cleanup_temp_files(video_hash)
                 
                 # Restart download
@@ -401,14 +409,17 @@ async def stream_video(video_hash: str, request: Request):
     await db.update_access(video_hash)
     
     # Find file
-    file_path = await storage.find_video_path(video_hash)
+    file_path = await storage.find_video_path(video_hash, video.get('file_ext'))
     
     if not file_path:
-        await db.update_status(video_hash, VideoStatus.DELETED)
+        if await db.update_status(
+            video_hash, VideoStatus.DELETED, from_status=VideoStatus.READY
+        ):
+            storage.on_delete(video.get('file_size'))
         raise HTTPException(status_code=404, detail="Video file not found")
     
-    # Check integrity
-    if not check_video_file_integrity(file_path):
+    # Check integrity (header read runs in a worker thread)
+    if not await asyncio.to_thread(check_video_file_integrity, file_path):
         logger.error(f"Corrupted file during streaming: {video_hash}")
         
         try:
@@ -416,7 +427,8 @@ async def stream_video(video_hash: str, request: Request):
         except:
             pass
         
-        await db.mark_video_deleted(video_hash)
+        if await db.mark_video_deleted(video_hash, from_status=VideoStatus.READY):
+            storage.on_delete(video.get('file_size'))
         raise HTTPException(status_code=410, detail="File corrupted, re-download required")
     
     # Determine MIME type
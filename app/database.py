@@ -1,21 +1,96 @@
 """
 Оптимизированная работа с базой данных
 """
+import asyncio
 import aiosqlite
 import logging
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple
 from contextlib import asynccontextmanager
 from app.config import settings
-from app.models import SQL_QUERIES, CREATE_VIDEOS_TABLE_SQL, CREATE_INDEXES_SQL, VideoStatus
+from app.models import (
+    SQL_QUERIES, CREATE_VIDEOS_TABLE_SQL, CREATE_INTEGRITY_CACHE_TABLE_SQL,
+    CREATE_INDEXES_SQL, CREATE_VIDEOS_FTS_SQL, CREATE_VIDEOS_FTS_TRIGGERS_SQL,
+    VideoStatus, VideoRow
+)
 from app import logger
 
+# Символы хеша: по хешу ищем, только если запрос может быть его частью
+_HEX_CHARS = frozenset("0123456789abcdefABCDEF")
+
+class DBWriteBatcher:
+    """
+    Отложенная пакетная запись статусов видео
+    
+    Обновления копятся в буфере и записываются одним
+    UPDATE ... WHERE hash IN (...) на каждый статус: через delay секунд
+    после первого обновления или сразу при накоплении max_pending записей.
+    Для одного хеша в буфере остаётся только последний статус.
+    """
+    
+    def __init__(self, database: "Database", delay: float = 0.1, max_pending: int = 32):
+        self._db = database
+        self._delay = delay
+        self._max_pending = max_pending
+        self._pending: Dict[str, VideoStatus] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+    
+    async def update_status(self, video_hash: str, status: VideoStatus):
+        """Ставит обновление статуса в буфер"""
+        self._pending[video_hash] = status
+        
+        if len(self._pending) >= self._max_pending:
+            await self.flush()
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+    
+    def discard(self, video_hash: str):
+        """Отбрасывает отложенное обновление (перед прямой записью)"""
+        self._pending.pop(video_hash, None)
+    
+    async def _flush_later(self):
+        await asyncio.sleep(self._delay)
+        await self.flush()
+    
+    async def flush(self):
+        """Записывает все накопленные обновления"""
+        if not self._pending:
+            return
+        
+        try:
+            # Через transaction(): запись не попадёт внутрь чужого BEGIN ... COMMIT
+            async with self._db.transaction():
+                # Буфер забираем под блокировкой, чтобы discard() во время ожидания сработал
+                pending, self._pending = self._pending, {}
+                
+                by_status: Dict[VideoStatus, List[str]] = {}
+                for video_hash, status in pending.items():
+                    by_status.setdefault(status, []).append(video_hash)
+                
+                for status, hashes in by_status.items():
+                    placeholders = ", ".join("?" * len(hashes))
+                    cursor = await self._db.conn.execute(
+                        f"UPDATE videos SET status = ? WHERE hash IN ({placeholders})",
+                        [status.value, *hashes]
+                    )
+                    await cursor.close()
+            
+            logger.debug(f"Статусы обновлены пакетно: {len(pending)}")
+        except Exception as e:
+            logger.error(f"Ошибка пакетного обновления статусов: {e}")
+
+
 class Database:
     """Класс для оптимизированной работы с SQLite"""
     
     def __init__(self):
         self.db_path = settings.storage.db_path
         self._connection_pool = None
+        self.status_batcher = DBWriteBatcher(self)
+        # Одна транзакция за раз на общем соединении
+        self._transaction_lock = asyncio.Lock()
+        # Поиск через FTS5 (иначе LIKE), определяется при подключении
+        self._fts_enabled = False
     
     async def connect(self):
         """Устанавливает соединение с базой данных"""
@@ -37,11 +112,15 @@ class Database:
             
             # Создаем таблицу
             await self.conn.execute(CREATE_VIDEOS_TABLE_SQL)
+            await self.conn.execute(CREATE_INTEGRITY_CACHE_TABLE_SQL)
 
             # Создаем индексы
             for index_sql in CREATE_INDEXES_SQL:
                 await self.conn.execute(index_sql)
 
+            # Полнотекстовый поиск
+            await self._setup_fts()
+
             await self.conn.commit()
             
             logger.info(f"База данных подключена: {self.db_path}")
@@ -49,9 +128,57 @@ class Database:
             logger.error(f"Ошибка подключения к БД: {e}")
             raise
     
+    async def _setup_fts(self):
+        """
+        Создаёт FTS5-индекс по названию и автору
+        
+        При первом создании индекс заполняется из существующих записей.
+        Если SQLite собран без FTS5, поиск остаётся на LIKE.
+        """
+        cursor = await self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'videos_fts'"
+        )
+        existed = await cursor.fetchone() is not None
+        await cursor.close()
+        
+        try:
+            await self.conn.execute(CREATE_VIDEOS_FTS_SQL)
+            for trigger_sql in CREATE_VIDEOS_FTS_TRIGGERS_SQL:
+                await self.conn.execute(trigger_sql)
+            if not existed:
+                await self.conn.execute(
+                    "INSERT INTO videos_fts (videos_fts) VALUES ('rebuild')"
+                )
+                logger.info("Полнотекстовый индекс videos_fts построен")
+            self._fts_enabled = True
+        except aiosqlite.OperationalError as e:
+            logger.warning(f"FTS5 недоступен, поиск через LIKE: {e}")
+            self._fts_enabled = False
+    
+    def _search_condition(self, search: str) -> Tuple[str, List[Any]]:
+        """
+        Условие WHERE для поиска по названию, автору и хешу
+        
+        С FTS5 каждое слово запроса ищется как префикс слова по индексу,
+        по хешу — подстрокой, только если запрос похож на хеш.
+        Без FTS5 — подстрока через LIKE по всем трём полям.
+        """
+        pattern = f"%{search}%"
+        words = search.split()
+        if not self._fts_enabled or not words:
+            return "(title LIKE ? OR uploader LIKE ? OR hash LIKE ?)", [pattern] * 3
+        
+        # Каждое слово в кавычках: спецсимволы FTS5 не интерпретируются
+        match_query = " ".join('"' + word.replace('"', '""') + '"*' for word in words)
+        condition = "rowid IN (SELECT rowid FROM videos_fts WHERE videos_fts MATCH ?)"
+        if set(search) <= _HEX_CHARS:
+            return f"({condition} OR hash LIKE ?)", [match_query, pattern]
+        return condition, [match_query]
+    
     async def close(self):
         """Закрывает соединение с базой данных"""
         if hasattr(self, 'conn') and self.conn:
+            await self.status_batcher.flush()
             await self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
             await self.conn.close()
             logger.info("Соединение с БД закрыто")
@@ -59,13 +186,29 @@ class Database:
     @asynccontextmanager
     async def transaction(self):
         """Контекстный менеджер для транзакций"""
-        try:
-            await self.conn.execute("BEGIN")
-            yield
-            await self.conn.execute("COMMIT")
-        except Exception:
-            await self.conn.execute("ROLLBACK")
-            raise
+        async with self._transaction_lock:
+            try:
+                await self.conn.execute("BEGIN")
+                yield
+                await self.conn.execute("COMMIT")
+            except Exception:
+                await self.conn.execute("ROLLBACK")
+                raise
+    
+    async def _execute_write(self, sql: str, params) -> int:
+        """
+        Одиночная запись на общем соединении
+        
+        Берёт ту же блокировку, что и transaction(): иначе запись может
+        попасть внутрь чужого BEGIN ... COMMIT и откатиться вместе с ним.
+        
+        Returns:
+            Количество изменённых записей
+        """
+        async with self._transaction_lock:
+            cursor = await self.conn.execute(sql, params)
+            await cursor.close()
+            return cursor.rowcount
     
     async def create_video(self, video_hash: str, source_url: str) -> bool:
         """
@@ -79,12 +222,11 @@ class Database:
             True если создано, False если уже существует
         """
         try:
-            cursor = await self.conn.execute(
+            created = await self._execute_write(
                 SQL_QUERIES["insert_video"],
                 (video_hash, source_url, VideoStatus.PENDING.value, datetime.now())
             )
-            await cursor.close()
-            return cursor.rowcount > 0
+            return created > 0
         except Exception as e:
             logger.error(f"Ошибка создания видео {video_hash}: {e}")
             return False
@@ -127,9 +269,9 @@ class Database:
             params.append(status.value)
 
         if search:
-            conditions.append("(title LIKE ? OR uploader LIKE ? OR hash LIKE ?)")
-            search_pattern = f"%{search}%"
-            params.extend([search_pattern, search_pattern, search_pattern])
+            search_condition, search_params = self._search_condition(search)
+            conditions.append(search_condition)
+            params.extend(search_params)
 
         where_clause = " AND ".join(conditions) if conditions else "1=1"
 
@@ -237,9 +379,9 @@ class Database:
             conditions.append("status = ?")
             params.append(status.value)
         if search:
-            conditions.append("(title LIKE ? OR uploader LIKE ? OR hash LIKE ?)")
-            search_pattern = f"%{search}%"
-            params.extend([search_pattern, search_pattern, search_pattern])
+            search_condition, search_params = self._search_condition(search)
+            conditions.append(search_condition)
+            params.extend(search_params)
         where_clause = " AND ".join(conditions) if conditions else "1=1"
         query = f"SELECT COUNT(*) FROM videos WHERE {where_clause}"
         cursor = await self.conn.execute(query, params)
@@ -257,14 +399,14 @@ class Database:
         file_ext: Optional[str]
     ) -> bool:
         """Оптимизированное обновление после загрузки"""
+        self.status_batcher.discard(video_hash)
         try:
-            cursor = await self.conn.execute(
+            updated = await self._execute_write(
                 SQL_QUERIES["update_on_download"],
                 (title, file_size, VideoStatus.READY.value, 
                  duration, uploader, file_ext, video_hash)
             )
-            await cursor.close()
-            return cursor.rowcount > 0
+            return updated > 0
         except Exception as e:
             logger.error(f"Ошибка обновления видео {video_hash}: {e}")
             return False
@@ -272,12 +414,11 @@ class Database:
     async def update_access(self, video_hash: str) -> bool:
         """Оптимизированное обновление доступа"""
         try:
-            cursor = await self.conn.execute(
+            updated = await self._execute_write(
                 SQL_QUERIES["update_access"], 
                 (video_hash,)
             )
-            await cursor.close()
-            return cursor.rowcount > 0
+            return updated > 0
         except Exception as e:
             logger.error(f"Ошибка обновления доступа {video_hash}: {e}")
             return False
@@ -336,6 +477,120 @@ class Database:
             return []
 
 
+    async def iter_ready_videos_by_lru(
+        self,
+        not_accessed_since: Optional[float] = None,
+        max_access_count: Optional[int] = None,
+        batch_size: int = 200
+    ) -> AsyncIterator[VideoRow]:
+        """
+        Iterate over ready videos from least to most recently accessed.
+        
+        Rows are fetched in batches with keyset pagination on
+        (last_accessed, rowid), so the caller can stop early and may
+        change video status while iterating. Never accessed videos
+        come first.
+        
+        Args:
+            not_accessed_since: Skip videos accessed after this unix timestamp
+            max_access_count: Skip videos with more views than this
+            batch_size: Rows fetched per query
+            
+        Yields:
+            VideoRow tuples
+        """
+        conditions = ["status = 'ready'", "file_size IS NOT NULL"]
+        filter_params = []
+        
+        if max_access_count is not None:
+            conditions.append("access_count <= ?")
+            filter_params.append(max_access_count)
+        
+        if not_accessed_since is not None:
+            # last_accessed is stored as CURRENT_TIMESTAMP (UTC text)
+            conditions.append(
+                "(last_accessed IS NULL OR last_accessed < datetime(?, 'unixepoch'))"
+            )
+            filter_params.append(int(not_accessed_since))
+        
+        query = f"""
+            SELECT rowid, hash, title, file_size, last_accessed, access_count, file_ext
+            FROM videos
+            WHERE {" AND ".join(conditions)} {{keyset}}
+            ORDER BY last_accessed, rowid
+            LIMIT ?
+        """
+        last_key = None
+        
+        while True:
+            if last_key is None:
+                keyset, params = "", []
+            elif last_key[0] is None:
+                keyset = "AND ((last_accessed IS NULL AND rowid > ?) OR last_accessed IS NOT NULL)"
+                params = [last_key[1]]
+            else:
+                keyset = "AND (last_accessed > ? OR (last_accessed = ? AND rowid > ?))"
+                params = [last_key[0], last_key[0], last_key[1]]
+            
+            # Errors go to the caller: a partial pass must not look like a complete one
+            try:
+                cursor = await self.conn.execute(
+                    query.format(keyset=keyset),
+                    filter_params + params + [batch_size]
+                )
+                rows = await cursor.fetchall()
+                await cursor.close()
+            except Exception as e:
+                logger.error(f"Error iterating ready videos: {e}")
+                raise
+            
+            if not rows:
+                return
+            
+            for row in rows:
+                yield VideoRow._make(row[1:])
+            
+            if len(rows) < batch_size:
+                return
+            
+            last_key = (rows[-1][4], rows[-1][0])
+
+    async def get_eviction_candidates(
+        self,
+        bytes_to_free: int,
+        **filters
+    ) -> List[VideoRow]:
+        """
+        Get the least recently accessed ready videos that together
+        free at least bytes_to_free.
+        
+        Only as many rows as the budget needs are read from the database.
+        
+        Args:
+            bytes_to_free: Space the candidates should cover
+            **filters: Passed to iter_ready_videos_by_lru
+            
+        Returns:
+            VideoRow tuples in eviction order
+        """
+        candidates = []
+        total_size = 0
+        
+        if bytes_to_free <= 0:
+            return candidates
+        
+        async for video in self.iter_ready_videos_by_lru(**filters):
+            if not video.file_size:
+                continue
+            
+            candidates.append(video)
+            total_size += video.file_size
+            if total_size >= bytes_to_free:
+                break
+        
+        return candidates
+
+
     async def get_all_videos(self) -> List[Dict[str, Any]]:
         """
         Get all videos.
@@ -423,25 +678,31 @@ class Database:
             logger.error(f"Ошибка получения хеша по URL {url}: {e}")
             return None
 
-    async def update_status(self, video_hash: str, status: VideoStatus) -> bool:
+    async def update_status(
+        self,
+        video_hash: str,
+        status: VideoStatus,
+        from_status: Optional[VideoStatus] = None
+    ) -> bool:
         """
         Обновляет статус видео
         
         Args:
             video_hash: Хеш видео
             status: Новый статус
+            from_status: Обновлять, только если видео сейчас в этом статусе
             
         Returns:
             True если обновлено
         """
+        self.status_batcher.discard(video_hash)
+        if from_status is None:
+            sql, params = SQL_QUERIES["update_status"], (status.value, video_hash)
+        else:
+            sql = SQL_QUERIES["update_status_from"]
+            params = (status.value, video_hash, from_status.value)
         try:
-            cursor = await self.conn.execute(
-                SQL_QUERIES["update_status"],
-                (status.value, video_hash)
-            )
-            await cursor.close()
-            
-            updated = cursor.rowcount > 0
+            updated = await self._execute_write(sql, params) > 0
             if updated:
                 logger.debug(f"Статус обновлен: {video_hash} -> {status.value}")
             
@@ -450,24 +711,28 @@ class Database:
             logger.error(f"Ошибка обновления статуса видео {video_hash}: {e}")
             return False
 
-    async def mark_video_deleted(self, video_hash: str) -> bool:
+    async def mark_video_deleted(
+        self,
+        video_hash: str,
+        from_status: Optional[VideoStatus] = None
+    ) -> bool:
         """
         Помечает видео как удаленное
         
         Args:
             video_hash: Хеш видео
+            from_status: Помечать, только если видео сейчас в этом статусе
             
         Returns:
             True если обновлено
         """
+        self.status_batcher.discard(video_hash)
+        if from_status is None:
+            sql, params = SQL_QUERIES["mark_deleted"], (video_hash,)
+        else:
+            sql, params = SQL_QUERIES["mark_deleted_from"], (video_hash, from_status.value)
         try:
-            cursor = await self.conn.execute(
-                SQL_QUERIES["mark_deleted"],
-                (video_hash,)
-            )
-            await cursor.close()
-            
-            updated = cursor.rowcount > 0
+            updated = await self._execute_write(sql, params) > 0
             if updated:
                 logger.debug(f"Видео помечено как удаленное: {video_hash}")
             
@@ -476,5 +741,85 @@ class Database:
             logger.error(f"Ошибка пометки видео как удаленного {video_hash}: {e}")
             return False
 
+    async def mark_videos_deleted(
+        self,
+        video_hashes: List[str],
+        from_status: Optional[VideoStatus] = None
+    ) -> List[str]:
+        """
+        Помечает несколько видео как удаленные одной транзакцией
+        
+        Args:
+            video_hashes: Хеши видео
+            from_status: Помечать только видео в этом статусе
+            
+        Returns:
+            Хеши действительно помеченных видео (пустой список при ошибке)
+        """
+        if not video_hashes:
+            return []
+        
+        for video_hash in video_hashes:
+            self.status_batcher.discard(video_hash)
+        
+        if from_status is None:
+            sql, extra_params = SQL_QUERIES["mark_deleted"], ()
+        else:
+            sql, extra_params = SQL_QUERIES["mark_deleted_from"], (from_status.value,)
+        
+        try:
+            marked = []
+            async with self.transaction():
+                # По запросу на хеш: rowcount показывает, какие записи изменились
+                for video_hash in video_hashes:
+                    cursor = await self.conn.execute(sql, (video_hash, *extra_params))
+                    await cursor.close()
+                    if cursor.rowcount > 0:
+                        marked.append(video_hash)
+            
+            logger.debug(f"Видео помечены как удаленные: {len(marked)}")
+            return marked
+        except Exception as e:
+            logger.error(f"Ошибка пометки {len(video_hashes)} видео как удаленных: {e}")
+            return []
+
+    async def get_integrity_cache(self) -> Dict[str, Tuple[int, int, float]]:
+        """
+        Загружает кэш проверок целостности одним запросом
+        
+        Returns:
+            Словарь {hash: (file_size, mtime, checked_at)}
+        """
+        try:
+            cursor = await self.conn.execute(SQL_QUERIES["get_integrity_cache"])
+            rows = await cursor.fetchall()
+            await cursor.close()
+            
+            return {row[0]: (row[1], row[2], row[3]) for row in rows}
+        except Exception as e:
+            logger.error(f"Ошибка загрузки кэша целостности: {e}")
+            return {}
+
+    async def set_integrity_cache(self, entries: List[Tuple[str, int, int, float]]) -> bool:
+        """
+        Сохраняет результаты успешных проверок и удаляет записи
+        для видео, которых больше нет в хранилище
+        
+        Args:
+            entries: Список (hash, file_size, mtime, checked_at)
+            
+        Returns:
+            True если сохранено
+        """
+        try:
+            async with self.transaction():
+                if entries:
+                    await self.conn.executemany(SQL_QUERIES["set_integrity_cache"], entries)
+                await self.conn.execute(SQL_QUERIES["prune_integrity_cache"])
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка сохранения кэша целостности: {e}")
+            return False
+
 # Глобальный экземпляр
 db = Database()
\ No newline at end of file
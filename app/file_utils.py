@@ -8,8 +8,10 @@ Handles:
 """
 
 from pathlib import Path
-from typing import Optional, List
+from typing import Optional, List, Dict
+import os
 import shutil
+import stat
 
 from app.config import settings
 from app import logger
@@ -63,48 +65,121 @@ def get_video_path_in_root(video_hash: str, ext: str) -> Path:
     return videos_dir / f"{video_hash}{ext}"
 
 
-def find_video_file(video_hash: str) -> Optional[Path]:
+def build_video_index() -> Dict[str, Path]:
+    """
+    Scan the storage once and map video hashes to file paths.
+    
+    Intended for sweeps that look up many videos: one directory
+    listing replaces a stat() per extension per video.
+    Files in subdirectories take precedence over root files.
+    
+    Returns:
+        Dict of {hash: path} for all video files
+    """
+    videos_dir = Path(settings.storage.videos_path)
+    if not videos_dir.exists():
+        return {}
+    
+    extensions = set(VIDEO_EXTENSIONS)
+    root_files = {}
+    index = {}
+    
+    for entry in videos_dir.iterdir():
+        if entry.is_dir():
+            for file_path in entry.iterdir():
+                if file_path.suffix in extensions:
+                    index.setdefault(file_path.stem, file_path)
+        elif entry.suffix in extensions:
+            root_files.setdefault(entry.stem, entry)
+    
+    for video_hash, file_path in root_files.items():
+        index.setdefault(video_hash, file_path)
+    
+    return index
+
+
+def find_video_file(
+    video_hash: str,
+    index: Optional[Dict[str, Path]] = None,
+    ext: Optional[str] = None
+) -> Optional[Path]:
     """
     Find a video file by hash.
     
     Search order:
+    0. Known extension (file_ext column): data/videos/{hash[:4]}/{hash}.{ext}
     1. New subdirectory structure: data/videos/{hash[:4]}/{hash}.{ext}
     2. Old root structure: data/videos/{hash}.{ext}
     3. If found in root, auto-migrate to subdirectory
     
     Args:
         video_hash: 64-character hash
+        index: Optional result of build_video_index() to look up
+            instead of probing the filesystem
+        ext: Optional known extension (with or without dot);
+            checked first with a single stat()
         
     Returns:
         Path to video file if found, None otherwise
     """
     videos_dir = Path(settings.storage.videos_path)
     
-    if not videos_dir.exists():
-        return None
+    if index is not None:
+        file_path = index.get(video_hash)
+        if file_path is None or file_path.parent != videos_dir:
+            return file_path
+        
+        # Found in root - auto-migrate to subdirectory
+        logger.info(f"Found video in root, migrating: {video_hash[:12]}...")
+        return _migrate_video_to_subdir(file_path, video_hash) or file_path
     
-    # 1. Search in subdirectory (new format)
-    subdir = get_video_subdir(video_hash)
-    subdir_path = videos_dir / subdir
+    # Plain string paths and os.stat: one syscall per probe,
+    # no pathlib objects for misses
+    videos_root = str(videos_dir)
+    subdir_base = os.path.join(videos_root, get_video_subdir(video_hash), video_hash)
+    
+    # 0. Exact path from the stored extension
+    if ext:
+        file_path = f"{subdir_base}.{ext.lstrip('.')}"
+        try:
+            if stat.S_ISREG(os.stat(file_path).st_mode):
+                return Path(file_path)
+        except (FileNotFoundError, NotADirectoryError):
+            pass
     
-    if subdir_path.exists():
-        for ext in VIDEO_EXTENSIONS:
-            file_path = subdir_path / f"{video_hash}{ext}"
-            if file_path.exists():
-                return file_path
+    # 1. Search in subdirectory (new format)
+    file_path = _probe_video_extensions(subdir_base)
+    if file_path is not None:
+        return file_path
     
     # 2. Search in root (old format)
+    file_path = _probe_video_extensions(os.path.join(videos_root, video_hash))
+    if file_path is not None:
+        # Found in root - auto-migrate to subdirectory
+        logger.info(f"Found video in root, migrating: {video_hash[:12]}...")
+        new_path = _migrate_video_to_subdir(file_path, video_hash)
+        if new_path:
+            return new_path
+        else:
+            # Migration failed, return old path
+            return file_path
+    
+    return None
+
+
+def _probe_video_extensions(base_path: str) -> Optional[Path]:
+    """
+    Return the first existing regular file base_path + ext.
+    
+    Extensions are probed in VIDEO_EXTENSIONS order, most common first.
+    """
     for ext in VIDEO_EXTENSIONS:
-        file_path = videos_dir / f"{video_hash}{ext}"
-        if file_path.exists():
-            # Found in root - auto-migrate to subdirectory
-            logger.info(f"Found video in root, migrating: {video_hash[:12]}...")
-            new_path = _migrate_video_to_subdir(file_path, video_hash)
-            if new_path:
-                return new_path
-            else:
-                # Migration failed, return old path
-                return file_path
+        file_path = base_path + ext
+        try:
+            if stat.S_ISREG(os.stat(file_path).st_mode):
+                return Path(file_path)
+        except (FileNotFoundError, NotADirectoryError):
+            pass
     
     return None
 
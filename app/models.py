@@ -3,7 +3,7 @@
 """
 from pydantic import BaseModel, Field, ConfigDict
 from datetime import datetime
-from typing import Optional
+from typing import Optional, NamedTuple
 from enum import Enum
 
 # --- Enums ---
@@ -52,6 +52,17 @@ class StorageInfo(BaseModel):
     video_count: int = Field(..., description="Количество видео")
     used_percent: float = Field(..., description="Использовано в процентах")
 
+# --- Легковесные строки БД (для внутренних обходов) ---
+
+class VideoRow(NamedTuple):
+    """Строка видео при обходе хранилища в порядке LRU"""
+    hash: str
+    title: Optional[str]
+    file_size: Optional[int]
+    last_accessed: Optional[str]
+    access_count: int
+    file_ext: Optional[str]
+
 # --- SQL запросы (оптимизированные) ---
 
 # Создание таблицы с индексами
@@ -71,6 +82,16 @@ CREATE TABLE IF NOT EXISTS videos (
 )
 """
 
+# Кэш результатов проверки целостности: (размер, mtime) файла на момент проверки
+CREATE_INTEGRITY_CACHE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS integrity_cache (
+    hash TEXT PRIMARY KEY,
+    file_size INTEGER NOT NULL,
+    mtime INTEGER NOT NULL,
+    checked_at REAL NOT NULL
+)
+"""
+
 # Создание индексов отдельными командами
 CREATE_INDEXES_SQL = [
     # Индекс для быстрого поиска по статусу и дате последнего доступа
@@ -89,6 +110,43 @@ CREATE_INDEXES_SQL = [
     "CREATE INDEX IF NOT EXISTS idx_status_file_size ON videos (status, file_size)"
 ]
 
+# Полнотекстовый индекс по названию и автору.
+# External content: сам текст хранится только в videos, индекс обновляют триггеры
+CREATE_VIDEOS_FTS_SQL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS videos_fts USING fts5(
+    title,
+    uploader,
+    content='videos',
+    content_rowid='rowid',
+    tokenize='unicode61 remove_diacritics 2'
+)
+"""
+
+CREATE_VIDEOS_FTS_TRIGGERS_SQL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS videos_fts_ai AFTER INSERT ON videos BEGIN
+        INSERT INTO videos_fts (rowid, title, uploader)
+        VALUES (new.rowid, new.title, new.uploader);
+    END
+    """,
+    
+    """
+    CREATE TRIGGER IF NOT EXISTS videos_fts_ad AFTER DELETE ON videos BEGIN
+        INSERT INTO videos_fts (videos_fts, rowid, title, uploader)
+        VALUES ('delete', old.rowid, old.title, old.uploader);
+    END
+    """,
+    
+    """
+    CREATE TRIGGER IF NOT EXISTS videos_fts_au AFTER UPDATE OF title, uploader ON videos BEGIN
+        INSERT INTO videos_fts (videos_fts, rowid, title, uploader)
+        VALUES ('delete', old.rowid, old.title, old.uploader);
+        INSERT INTO videos_fts (rowid, title, uploader)
+        VALUES (new.rowid, new.title, new.uploader);
+    END
+    """
+]
+
 
 # Подготовленные SQL запросы
 SQL_QUERIES = {
@@ -118,6 +176,10 @@ SQL_QUERIES = {
         UPDATE videos SET status = ? WHERE hash = ?
     """,
     
+    "update_status_from": """
+        UPDATE videos SET status = ? WHERE hash = ? AND status = ?
+    """,
+    
     "get_by_status": """
         SELECT * FROM videos WHERE status = ? ORDER BY last_accessed
     """,
@@ -147,7 +209,27 @@ SQL_QUERIES = {
         WHERE hash = ?
     """,
     
+    "mark_deleted_from": """
+        UPDATE videos 
+        SET status = 'deleted', file_size = NULL, file_ext = NULL
+        WHERE hash = ? AND status = ?
+    """,
+    
     "get_video_by_url": """
         SELECT hash FROM videos WHERE source_url = ? LIMIT 1
+    """,
+    
+    "get_integrity_cache": """
+        SELECT hash, file_size, mtime, checked_at FROM integrity_cache
+    """,
+    
+    "set_integrity_cache": """
+        INSERT OR REPLACE INTO integrity_cache (hash, file_size, mtime, checked_at)
+        VALUES (?, ?, ?, ?)
+    """,
+    
+    "prune_integrity_cache": """
+        DELETE FROM integrity_cache
+        WHERE hash NOT IN (SELECT hash FROM videos WHERE status = 'ready')
     """
 }
\ No newline at end of file
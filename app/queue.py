@@ -4,8 +4,8 @@
 import asyncio
 import time
 import logging
-from typing import Dict, Any, Optional, Deque, List
-from collections import deque
+from itertools import islice
+from typing import Dict, Any, Optional, List, Iterator, Set
 from dataclasses import dataclass, field
 
 from app.config import settings
@@ -15,7 +15,7 @@ from app.models import VideoStatus
 from app.storage import storage
 from app import logger
 
-@dataclass
+@dataclass(slots=True)
 class DownloadTask:
     """Задача на загрузку"""
     video_hash: str
@@ -24,6 +24,23 @@ class DownloadTask:
     started_at: Optional[float] = None
     retry_count: int = 0
     worker_id: Optional[int] = None
+    
+    # Поля для отображения, вычисляются один раз при создании
+    short_hash: str = field(init=False, repr=False)
+    display_url: str = field(init=False, repr=False)
+    
+    def __post_init__(self):
+        self.short_hash = self.video_hash[:12] + '...'
+        self.display_url = self.url[:80] + '...' if len(self.url) > 80 else self.url
+
+class TaskFifo(asyncio.Queue):
+    """asyncio.Queue с возможностью просмотра ожидающих задач"""
+    
+    def __iter__(self) -> Iterator[DownloadTask]:
+        return iter(self._queue)
+    
+    def __len__(self) -> int:
+        return self.qsize()
 
 class TaskQueue:
     """Очередь с фиксированным количеством воркеров"""
@@ -32,7 +49,8 @@ class TaskQueue:
         self.downloader = VideoDownloader()
         
         # Основные структуры данных
-        self._queue: Deque[DownloadTask] = deque()           # Очередь ожидания
+        self._queue: TaskFifo = TaskFifo()                   # Очередь ожидания
+        self._queued_hashes: Set[str] = set()                # Хеши задач в очереди
         self._active_tasks: Dict[str, DownloadTask] = {}     # Активные задачи по хешу
         self._task_futures: Dict[str, asyncio.Future] = {}   # Futures для ожидания
         
@@ -50,21 +68,19 @@ class TaskQueue:
         self._cleanup_monitor_task: Optional[asyncio.Task] = None
         
         # Статистика
-        self._stats = {
-            'added': 0,
-            'completed': 0,
-            'failed': 0,
-            'retried': 0
-        }
+        self._stat_added = 0
+        self._stat_completed = 0
+        self._stat_failed = 0
+        self._stat_retried = 0
         
-        logger.info(f"Очередь создана (воркеров: {self._max_concurrent})")
+        logger.info("Очередь создана (воркеров: %s)", self._max_concurrent)
     
     async def start(self):
         """Запускает очередь"""
         if self._is_running:
             return
         
-        logger.info(f"Запуск очереди с {self._max_concurrent} воркерами...")
+        logger.info("Запуск очереди с %s воркерами...", self._max_concurrent)
         self._is_running = True
         
         # Восстанавливаем задачи из БД
@@ -81,10 +97,10 @@ class TaskQueue:
         # Запускаем мониторинг зависших задач
         self._cleanup_monitor_task = asyncio.create_task(self._cleanup_monitor_loop())
         
-        logger.info(f"✅ Очередь запущена")
-        logger.info(f"   Воркеров: {len(self._workers)}")
-        logger.info(f"   Задач в очереди: {len(self._queue)}")
-        logger.info(f"   Активных задач: {len(self._active_tasks)}")
+        logger.info("✅ Очередь запущена")
+        logger.info("   Воркеров: %s", len(self._workers))
+        logger.info("   Задач в очереди: %s", len(self._queue))
+        logger.info("   Активных задач: %s", len(self._active_tasks))
     
     async def stop(self):
         """Останавливает очередь"""
@@ -120,24 +136,24 @@ class TaskQueue:
         async with self._lock:
             # Проверяем, не обрабатывается ли уже эта задача
             if video_hash in self._active_tasks:
-                logger.debug(f"Задача уже активна: {video_hash[:12]}")
+                logger.debug("Задача уже активна: %s", video_hash[:12])
                 return False
             
             # Проверяем, нет ли в очереди
-            for task in self._queue:
-                if task.video_hash == video_hash:
-                    logger.debug(f"Задача уже в очереди: {video_hash[:12]}")
-                    return False
+            if video_hash in self._queued_hashes:
+                logger.debug("Задача уже в очереди: %s", video_hash[:12])
+                return False
             
             # Создаём новую задачу
             task = DownloadTask(video_hash=video_hash, url=url)
-            self._queue.append(task)
+            self._queue.put_nowait(task)
+            self._queued_hashes.add(video_hash)
             self._task_futures[video_hash] = asyncio.Future()
             
-            self._stats['added'] += 1
+            self._stat_added += 1
             
-            logger.info(f"✅ Задача добавлена: {video_hash[:12]}")
-            logger.debug(f"   Позиция в очереди: {len(self._queue)}")
+            logger.info("✅ Задача добавлена: %s", video_hash[:12])
+            logger.debug("   Позиция в очереди: %s", len(self._queue))
             
             return True
     
@@ -149,15 +165,20 @@ class TaskQueue:
                     return i
             return None
     
-    async def get_queue_info(self) -> Dict[str, Any]:
-        """Получает информацию об очереди"""
+    async def get_queue_info(self, peek_limit: int = 20) -> Dict[str, Any]:
+        """
+        Получает информацию об очереди
+        
+        Args:
+            peek_limit: Сколько задач из начала очереди включить в 'queue'
+        """
         async with self._lock:
             # Задачи в очереди
             queue_tasks = []
-            for i, task in enumerate(list(self._queue)[:20]):
+            for i, task in enumerate(islice(self._queue, peek_limit)):
                 queue_tasks.append({
-                    'hash': task.video_hash[:12] + '...',
-                    'url': task.url[:80] + '...' if len(task.url) > 80 else task.url,
+                    'hash': task.short_hash,
+                    'url': task.display_url,
                     'retry_count': task.retry_count,
                     'added_at': task.added_at,
                     'position': i + 1
@@ -168,8 +189,8 @@ class TaskQueue:
             current_time = time.time()
             for task in self._active_tasks.values():
                 active_tasks_list.append({
-                    'hash': task.video_hash[:12] + '...',
-                    'url': task.url[:80] + '...' if len(task.url) > 80 else task.url,
+                    'hash': task.short_hash,
+                    'url': task.display_url,
                     'retry_count': task.retry_count,
                     'started_at': task.started_at,
                     'worker_id': task.worker_id,
@@ -186,7 +207,12 @@ class TaskQueue:
                 'max_concurrent': self._max_concurrent,
                 'working_workers': working_workers,
                 'total_workers': len(self._workers),
-                'stats': self._stats.copy(),
+                'stats': {
+                    'added': self._stat_added,
+                    'completed': self._stat_completed,
+                    'failed': self._stat_failed,
+                    'retried': self._stat_retried
+                },
                 'queue': queue_tasks,
                 'active_tasks_list': active_tasks_list,
                 'has_cleanup_monitor': self._cleanup_monitor_task is not None
@@ -220,60 +246,62 @@ class TaskQueue:
                 if await self.add_task(video_hash, url):
                     restored += 1
             
-            logger.info(f"Восстановлено задач: {restored}")
+            logger.info("Восстановлено задач: %s", restored)
             return restored
             
         except Exception as e:
-            logger.error(f"Ошибка восстановления задач: {e}")
+            logger.error("Ошибка восстановления задач: %s", e)
             return 0
     
     async def _worker_loop(self, worker_id: int):
         """Цикл одного воркера с таймаутом между загрузками"""
-        logger.debug(f"Воркер {worker_id} запущен")
+        logger.debug("Воркер %s запущен", worker_id)
+        
+        # Неизменяемые во время работы атрибуты
+        timeout = self._download_timeout
+        lock = self._lock
+        queue = self._queue
+        queued_hashes = self._queued_hashes
+        active = self._active_tasks
         
         while self._is_running:
             try:
-                # Берём задачу из очереди
-                task = None
-                async with self._lock:
-                    if self._queue:
-                        task = self._queue.popleft()
-                        self._active_tasks[task.video_hash] = task
+                # Ждём задачу из очереди
+                task = await queue.get()
+                async with lock:
+                    queued_hashes.discard(task.video_hash)
+                    active[task.video_hash] = task
                 
-                if task:
-                    # Обрабатываем задачу
-                    task.worker_id = worker_id
-                    await self._process_task(task)
-                    
-                    # ЖДЁМ таймаут между загрузками
-                    if self._download_timeout > 0:
-                        logger.debug(f"Воркер {worker_id} ждёт {self._download_timeout}с перед следующей задачей")
-                        await asyncio.sleep(self._download_timeout)
-                else:
-                    # Если нет задач, ждём
-                    await asyncio.sleep(5)
+                # Обрабатываем задачу
+                task.worker_id = worker_id
+                await self._process_task(task)
+                
+                # ЖДЁМ таймаут между загрузками
+                if timeout > 0:
+                    logger.debug("Воркер %s ждёт %sс перед следующей задачей", worker_id, timeout)
+                    await asyncio.sleep(timeout)
                     
             except asyncio.CancelledError:
                 break
             except Exception as e:
-                logger.error(f"Ошибка в воркере {worker_id}: {e}")
+                logger.error("Ошибка в воркере %s: %s", worker_id, e)
                 # Ждём перед повторной попыткой даже при ошибке
-                if self._download_timeout > 0:
-                    await asyncio.sleep(self._download_timeout)
+                if timeout > 0:
+                    await asyncio.sleep(timeout)
                 else:
                     await asyncio.sleep(2)
         
-        logger.debug(f"Воркер {worker_id} остановлен")
+        logger.debug("Воркер %s остановлен", worker_id)
     
     async def _process_task(self, task: DownloadTask):
         """Обрабатывает одну задачу"""
         task.started_at = time.time()
         
         try:
-            logger.info(f"▶️  Воркер {task.worker_id} начинает загрузку: {task.video_hash[:12]}")
+            logger.info("▶️  Воркер %s начинает загрузку: %s", task.worker_id, task.video_hash[:12])
             
             # Обновляем статус в БД
-            await db.update_status(task.video_hash, VideoStatus.DOWNLOADING)
+            await db.status_batcher.update_status(task.video_hash, VideoStatus.DOWNLOADING)
             
             # Загружаем видео
             result = await self.downloader.download(task.url, task.video_hash)
@@ -293,17 +321,18 @@ class TaskQueue:
             
             if not success:
                 raise Exception("Не удалось обновить запись в БД")
+            storage.on_download_complete(result['file_size'])
             
             # Успешное завершение
-            logger.info(f"✅ Воркер {task.worker_id} завершил: {task.video_hash[:12]}")
-            self._stats['completed'] += 1
+            logger.info("✅ Воркер %s завершил: %s", task.worker_id, task.video_hash[:12])
+            self._stat_completed += 1
             
             # Помечаем future как выполненное
             if task.video_hash in self._task_futures:
                 self._task_futures[task.video_hash].set_result(True)
                 
         except Exception as e:
-            logger.error(f"❌ Воркер {task.worker_id} ошибка: {task.video_hash[:12]} - {e}")
+            logger.error("❌ Воркер %s ошибка: %s - %s", task.worker_id, task.video_hash[:12], e)
             await self._handle_task_error(task, e)
             
         finally:
@@ -315,22 +344,23 @@ class TaskQueue:
         task.retry_count += 1
         
         if task.retry_count < self._max_retries:
-            logger.info(f"🔄 Повтор задачи {task.video_hash[:12]} ({task.retry_count}/{self._max_retries})")
-            self._stats['retried'] += 1
+            logger.info("🔄 Повтор задачи %s (%s/%s)", task.video_hash[:12], task.retry_count, self._max_retries)
+            self._stat_retried += 1
             
             # Возвращаем задачу в очередь для повторной попытки
             async with self._lock:
-                self._queue.append(task)
+                self._queue.put_nowait(task)
+                self._queued_hashes.add(task.video_hash)
             
             # Обновляем статус в БД на PENDING для повторной попытки
-            await db.update_status(task.video_hash, VideoStatus.PENDING)
+            await db.status_batcher.update_status(task.video_hash, VideoStatus.PENDING)
             
         else:
-            logger.error(f"🚫 Превышен лимит повторов: {task.video_hash[:12]}")
-            self._stats['failed'] += 1
+            logger.error("🚫 Превышен лимит повторов: %s", task.video_hash[:12])
+            self._stat_failed += 1
             
             # Обновляем статус в БД на FAILED - окончательная ошибка
-            await db.update_status(task.video_hash, VideoStatus.FAILED)
+            await db.status_batcher.update_status(task.video_hash, VideoStatus.FAILED)
             
             # Помечаем future как завершённое с ошибкой
             if task.video_hash in self._task_futures:
@@ -352,6 +382,8 @@ class TaskQueue:
         """Мониторит и очищает зависшие задачи"""
         logger.debug("Запущен мониторинг зависших задач")
         
+        active = self._active_tasks
+        
         while self._is_running:
             try:
                 await asyncio.sleep(60)  # Проверяем каждую минуту
@@ -361,20 +393,20 @@ class TaskQueue:
                 
                 async with self._lock:
                     # Ищем задачи, которые выполняются слишком долго (> 10 минут)
-                    for task in self._active_tasks.values():
+                    for task in active.values():
                         if task.started_at and (current_time - task.started_at) > 600:
                             stale_tasks.append(task)
                 
                 # Обрабатываем зависшие задачи
                 for task in stale_tasks:
-                    logger.warning(f"Обнаружена зависшая задача: {task.video_hash[:12]}")
+                    logger.warning("Обнаружена зависшая задача: %s", task.video_hash[:12])
                     
                     # Обновляем статус в БД на FAILED
-                    await db.update_status(task.video_hash, VideoStatus.FAILED)
+                    await db.status_batcher.update_status(task.video_hash, VideoStatus.FAILED)
                     
                     # Удаляем задачу
                     async with self._lock:
-                        self._active_tasks.pop(task.video_hash, None)
+                        active.pop(task.video_hash, None)
                     
                     # Завершаем future с ошибкой
                     if task.video_hash in self._task_futures:
@@ -386,7 +418,7 @@ class TaskQueue:
             except asyncio.CancelledError:
                 break
             except Exception as e:
-                logger.error(f"Ошибка в мониторинге зависших задач: {e}")
+                logger.error("Ошибка в мониторинге зависших задач: %s", e)
     
     async def _check_storage_space(self):
         """Проверяет место в хранилище"""
@@ -395,13 +427,13 @@ class TaskQueue:
             used_percent = storage_info['used_percent']
             
             if used_percent > 90:
-                logger.warning(f"Хранилище заполнено на {used_percent:.1f}%, запуск очистки...")
+                logger.warning("Хранилище заполнено на %.1f%%, запуск очистки...", used_percent)
                 deleted = await storage.cleanup_old_videos()
                 if deleted:
-                    logger.info(f"Очищено видео: {len(deleted)}")
+                    logger.info("Очищено видео: %s", len(deleted))
             
         except Exception as e:
-            logger.error(f"Ошибка проверки хранилища: {e}")
+            logger.error("Ошибка проверки хранилища: %s", e)
 
 # Глобальный экземпляр
 queue = TaskQueue()
\ No newline at end of file
@@ -14,17 +14,24 @@ import os
 import asyncio
 import time
 import re
-from datetime import datetime, timedelta
+import calendar
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 
 from app.config import settings
 from app.database import db
-from app.file_utils import find_video_file, get_all_video_files
+from app.models import VideoRow, VideoStatus
+from app.file_utils import find_video_file, build_video_index, get_all_video_files
 from app.utils import check_video_file_integrity
 from app import logger
 
 
+# Backups made by the rotating handler of server.log (server.log.2024-01-01).
+# The live server.log itself never matches
+_LOG_DATE_PATTERN = re.compile(r'^server\.log\.(\d{4})-(\d{2})-(\d{2})$')
+
+
 class StorageManager:
     """
     Storage management for video files.
@@ -34,12 +41,25 @@ class StorageManager:
     - Automatic cleanup of old videos when storage is full
     - Video file integrity checking
     - Old log file cleanup
-    - Smart cleanup: prioritizes old + low-view videos
+    - LRU cleanup: least recently watched videos are removed first
     """
     
     # Supported video formats for file discovery
     VIDEO_EXTENSIONS = ['.mp4', '.webm', '.mkv', '.avi', '.mov', '.flv', '.wmv']
     
+    # Videos spared by cleanup unless space cannot be freed otherwise
+    POPULAR_ACCESS_COUNT = 10
+    RECENT_ACCESS_SECONDS = 24 * 3600
+    
+    # Number of files checked concurrently during integrity sweeps
+    INTEGRITY_BATCH_SIZE = 32
+    
+    # Deleted videos are marked in the database in batches of this size
+    DELETE_BATCH_SIZE = 100
+    
+    # Unchanged files are re-checked only after this long
+    INTEGRITY_CACHE_TTL = 30 * 24 * 3600
+    
     def __init__(self):
         """Initialize storage manager."""
         self.videos_path = Path(settings.storage.videos_path)
@@ -60,6 +80,18 @@ class StorageManager:
         self._cleanup_running = False
         self._monitor_task = None
         self._is_monitoring = False
+        
+        # Dedicated pool for file checks, so integrity sweeps
+        # do not starve the default executor used elsewhere
+        self._io_executor = ThreadPoolExecutor(
+            max_workers=min(8, os.cpu_count() or 1),
+            thread_name_prefix="storage-io"
+        )
+        
+        # Usage counters, kept in sync on download/delete
+        # and reconciled with the database on every monitoring pass
+        self._total_size_bytes = 0
+        self._video_count = 0
     
     async def start_monitoring(self):
         """Start background storage monitoring."""
@@ -67,6 +99,7 @@ class StorageManager:
             return
             
         self._is_monitoring = True
+        await self.reconcile_stats()
         self._monitor_task = asyncio.create_task(self._monitor_loop())
         logger.info("Storage monitoring started")
     
@@ -104,6 +137,7 @@ class StorageManager:
         current_time = time.time()
         
         # 1. Check storage usage
+        await self.reconcile_stats()
         storage_info = await self.get_storage_info()
         if (storage_info['used_percent'] >= self.storage_cleanup_threshold and 
             not self._cleanup_running):
@@ -117,6 +151,11 @@ class StorageManager:
         if (current_time - self._last_integrity_check > self.integrity_check_interval and 
             not self._integrity_check_running):
             asyncio.create_task(self._safe_check_video_integrity())
+        
+        # 3. Clean up old logs
+        if current_time - self._last_log_cleanup > self.log_check_interval:
+            self._last_log_cleanup = current_time
+            await self.cleanup_old_logs()
     
     async def _safe_cleanup_old_videos(self):
         """Safely cleanup old videos (prevents concurrent runs)."""
@@ -143,93 +182,13 @@ class StorageManager:
         finally:
             self._integrity_check_running = False
 
-    def _calculate_video_score(self, video: Dict[str, Any]) -> float:
-        """
-        Calculate cleanup priority score for a video.
-        
-        Lower score = higher priority for deletion.
-        
-        Factors:
-        - Last accessed time (older = lower score)
-        - Access count (fewer views = lower score)
-        - Age (older = lower score)
-        
-        Returns:
-            Float score (lower = better candidate for deletion)
-        """
-        # Get timestamps
-        last_accessed = video.get('last_accessed')
-        created_at = video.get('created_at')
-        access_count = video.get('access_count', 0)
-        
-        now = datetime.now()
-        
-        # Default values if timestamps missing
-        if last_accessed:
-            if isinstance(last_accessed, str):
-                try:
-                    last_accessed = datetime.fromisoformat(last_accessed.replace(' ', 'T'))
-                except:
-                    last_accessed = now
-        else:
-            # If never accessed, use created_at or current time
-            if created_at:
-                if isinstance(created_at, str):
-                    try:
-                        last_accessed = datetime.fromisoformat(created_at.replace(' ', 'T'))
-                    except:
-                        last_accessed = now
-                else:
-                    last_accessed = created_at
-            else:
-                last_accessed = now
-        
-        if created_at:
-            if isinstance(created_at, str):
-                try:
-                    created_at = datetime.fromisoformat(created_at.replace(' ', 'T'))
-                except:
-                    created_at = now
-        else:
-            created_at = now
-        
-        # Calculate days since last access
-        days_since_access = (now - last_accessed).total_seconds() / 86400
-        days_since_created = (now - created_at).total_seconds() / 86400
-        
-        # --- Score calculation ---
-        # 1. Access time factor: older = higher priority (lower score)
-        # Max 100 days, after that no additional penalty
-        access_factor = min(days_since_access, 100) / 100 * 0.6
-        
-        # 2. View count factor: fewer views = higher priority (lower score)
-        # Max 1000 views, after that no benefit
-        view_factor = min(1.0, access_count / 1000) * 0.3
-        
-        # 3. Age factor: older = higher priority (lower score)
-        # Max 365 days
-        age_factor = min(days_since_created, 365) / 365 * 0.1
-        
-        # Combined score (lower = better candidate for deletion)
-        # Invert so that:
-        # - Old, low-view videos get LOW score (high priority for deletion)
-        # - New, high-view videos get HIGH score (low priority for deletion)
-        score = 1.0 - (access_factor * 0.6 + view_factor * 0.3 + age_factor * 0.1)
-        
-        # Add small random factor to avoid always deleting the same videos
-        # when many have similar scores
-        score += (hash(video['hash']) % 1000) / 10000
-        
-        return score
-
     async def cleanup_old_videos(self) -> List[str]:
         """
-        Remove oldest + least viewed videos to free up storage space.
+        Remove least recently used videos to free up storage space.
         
-        Uses smart scoring:
-        - Older videos = higher priority
-        - Fewer views = higher priority
-        - Combines both factors
+        Videos are streamed from the database in LRU order (never
+        accessed first), so only the rows needed to reach the target
+        are loaded.
         
         Returns:
             List of deleted video hashes
@@ -241,15 +200,8 @@ class StorageManager:
         deleted_hashes = []
         
         try:
-            # Get all ready videos
-            videos = await db.get_all_ready_videos()
-            
-            if not videos:
-                logger.debug("No videos to clean up")
-                return []
-            
             # Calculate current storage usage
-            current_size = sum(v.get('file_size', 0) for v in videos)
+            current_size = self._total_size_bytes
             target_size = self.max_size_bytes * (1 - self.target_free_space / 100)
             
             # Check if cleanup is needed
@@ -268,84 +220,21 @@ class StorageManager:
                 f"(target: {self.target_free_space}% free)"
             )
             
-            # Score each video and sort by score (lowest = highest priority for deletion)
-            scored_videos = []
-            for video in videos:
-                video_hash = video['hash']
-                file_size = video.get('file_size', 0)
-                
-                # Skip videos with zero size (shouldn't happen for READY)
-                if not file_size:
-                    continue
-                
-                # Check if file actually exists
-                file_path = await self.find_video_path(video_hash)
-                if not file_path or not file_path.exists():
-                    # Mark as deleted in DB, but don't count for cleanup
-                    await db.mark_video_deleted(video_hash)
-                    continue
-                
-                score = self._calculate_video_score(video)
-                scored_videos.append({
-                    'hash': video_hash,
-                    'score': score,
-                    'file_size': file_size,
-                    'file_path': file_path,
-                    'title': video.get('title', 'Untitled'),
-                    'access_count': video.get('access_count', 0),
-                    'last_accessed': video.get('last_accessed'),
-                })
-            
-            # Sort by score (lowest first = highest deletion priority)
-            scored_videos.sort(key=lambda x: x['score'])
-            
-            # Log top candidates
-            if scored_videos:
-                logger.info(f"Top 5 cleanup candidates:")
-                for i, v in enumerate(scored_videos[:5]):
-                    logger.info(
-                        f"  {i+1}. {v['title'][:30]}... "
-                        f"(score: {v['score']:.3f}, "
-                        f"views: {v['access_count']}, "
-                        f"size: {v['file_size']:,} bytes)"
-                    )
-            
-            # Delete videos until we've freed enough space
-            freed_space = 0
-            deleted_count = 0
-            
-            for video in scored_videos:
-                if freed_space >= needed_space:
-                    break
-                    
-                video_hash = video['hash']
-                file_path = video['file_path']
-                file_size = video['file_size']
-                
-                try:
-                    # Delete file
-                    if file_path and file_path.exists():
-                        file_path.unlink()
-                        freed_space += file_size
-                        deleted_count += 1
-                        deleted_hashes.append(video_hash)
-                        
-                        # Mark in database
-                        await db.mark_video_deleted(video_hash)
-                        
-                        logger.info(
-                            f"Deleted: {video['title'][:30]}... "
-                            f"({file_size:,} bytes, "
-                            f"views: {video['access_count']}, "
-                            f"score: {video['score']:.3f})"
-                        )
-                    else:
-                        # File missing, mark as deleted
-                        await db.mark_video_deleted(video_hash)
-                        logger.warning(f"File missing for {video_hash[:12]}, marked as deleted")
-                        
-                except Exception as e:
-                    logger.error(f"Failed to delete {video_hash[:12]}: {e}")
+            # First pass spares popular and recently watched videos,
+            # second pass takes any video if that was not enough
+            freed_space = await self._evict_lru_videos(
+                needed_space,
+                deleted_hashes,
+                not_accessed_since=time.time() - self.RECENT_ACCESS_SECONDS,
+                max_access_count=self.POPULAR_ACCESS_COUNT
+            )
+            if freed_space < needed_space:
+                logger.info("Not enough space freed, including popular and recent videos")
+                freed_space += await self._evict_lru_videos(
+                    needed_space - freed_space,
+                    deleted_hashes
+                )
+            deleted_count = len(deleted_hashes)
             
             # Log cleanup results
             logger.info(
@@ -367,21 +256,193 @@ class StorageManager:
         
         return deleted_hashes
     
-    def _get_file_date(self, file_path: Path) -> datetime:
+    async def _evict_lru_videos(
+        self,
+        needed_space: int,
+        deleted_hashes: List[str],
+        **filters
+    ) -> int:
+        """
+        Delete videos in LRU order until needed_space bytes are freed.
+        
+        Args:
+            needed_space: Bytes to free
+            deleted_hashes: List to append deleted video hashes to
+            **filters: Passed to db.get_eviction_candidates
+            
+        Returns:
+            Number of bytes freed
+        """
+        freed_space = 0
+        loop = asyncio.get_running_loop()
+        # Hashes already tried: rows whose mark failed must not come back every round
+        attempted = set()
+        
+        # Candidates with missing files free nothing,
+        # so ask for more until the budget is covered
+        while freed_space < needed_space:
+            candidates = [
+                video for video in await db.get_eviction_candidates(
+                    needed_space - freed_space, **filters
+                )
+                if video.hash not in attempted
+            ]
+            if not candidates:
+                break
+            
+            pending_deleted = []
+            marked_count = 0
+            
+            for video in candidates:
+                video_hash = video.hash
+                file_size = video.file_size
+                attempted.add(video_hash)
+                
+                try:
+                    file_found = await loop.run_in_executor(
+                        self._io_executor, self._delete_video_file,
+                        video_hash, video.file_ext
+                    )
+                    
+                    # Mark in database (batched)
+                    pending_deleted.append((video_hash, file_size))
+                    if len(pending_deleted) >= self.DELETE_BATCH_SIZE:
+                        marked_count += await self.mark_videos_deleted(pending_deleted)
+                        pending_deleted = []
+                    
+                    if not file_found:
+                        logger.warning(f"File missing for {video_hash[:12]}, marked as deleted")
+                        continue
+                    
+                    freed_space += file_size
+                    deleted_hashes.append(video_hash)
+                    
+                    logger.info(
+                        f"Deleted: {(video.title or 'Untitled')[:30]}... "
+                        f"({file_size:,} bytes, "
+                        f"views: {video.access_count}, "
+                        f"last accessed: {video.last_accessed or 'never'})"
+                    )
+                        
+                except Exception as e:
+                    logger.error(f"Failed to delete {video_hash[:12]}: {e}")
+            
+            marked_count += await self.mark_videos_deleted(pending_deleted)
+            
+            # Nothing could be marked (every candidate or DB write failed)
+            if marked_count == 0:
+                break
+        
+        return freed_space
+    
+    async def mark_videos_deleted(self, videos: List[Tuple[str, Optional[int]]]) -> int:
+        """
+        Mark ready videos as deleted and update the storage counters.
+        
+        Only rows that were still ready are counted, so a failed database
+        write or a concurrent deletion never decrements the counters.
+        
+        Args:
+            videos: (hash, file_size) pairs
+            
+        Returns:
+            Number of rows marked
+        """
+        if not videos:
+            return 0
+        
+        sizes = dict(videos)
+        marked = await db.mark_videos_deleted(list(sizes), from_status=VideoStatus.READY)
+        for video_hash in marked:
+            self.on_delete(sizes[video_hash])
+        return len(marked)
+    
+    def _delete_video_file(self, video_hash: str, ext: Optional[str] = None) -> bool:
+        """
+        Find and delete a video file. Runs in a worker thread.
+        
+        Returns:
+            True if the file was found, False if it was missing
+        """
+        file_path = find_video_file(video_hash, ext=ext)
+        if file_path is None:
+            return False
+        
+        # Delete file (may already be gone if removed concurrently)
+        try:
+            file_path.unlink()
+        except FileNotFoundError:
+            pass
+        
+        return True
+    
+    async def cleanup_old_logs(self) -> int:
         """
-        Determine file date from name or modification time.
+        Delete rotated log backups older than log_retention_days.
         
-        Tries to extract date from filename (format: name_YYYY-MM-DD.log)
-        Falls back to modification time.
+        Returns:
+            Number of removed log files
         """
-        # Try to extract date from filename
-        date_match = re.search(r'(\d{4})-(\d{2})-(\d{2})', file_path.stem)
-        if date_match:
-            year, month, day = map(int, date_match.groups())
-            return datetime(year, month, day)
-        
-        # Fallback to modification time
-        return datetime.fromtimestamp(file_path.stat().st_mtime)
+        cutoff_time = time.time() - self.log_retention_days * 86400
+        
+        try:
+            removed = await asyncio.to_thread(self._remove_old_logs, cutoff_time)
+        except Exception as e:
+            logger.error(f"Log cleanup error: {e}")
+            return 0
+        
+        if removed:
+            logger.info(f"Removed {removed} old log files")
+        
+        return removed
+    
+    def _remove_old_logs(self, cutoff_time: float) -> int:
+        """
+        Delete rotated log backups dated before cutoff_time.
+        Runs in a worker thread.
+        
+        TimedRotatingFileHandler prunes backups only when it rolls over,
+        which takes a new log record; on a quiet server old backups would
+        outlive the retention period. The live log is never touched.
+        """
+        removed = 0
+        
+        try:
+            entries = os.scandir(settings.storage.logs_path)
+        except FileNotFoundError:
+            return 0
+        
+        with entries:
+            for entry in entries:
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                
+                try:
+                    # Only rotated backups have a date in the name
+                    file_date = self._get_file_date(entry.name)
+                    if file_date is not None and file_date < cutoff_time:
+                        os.unlink(entry.path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.warning(f"Failed to remove log {entry.name}: {e}")
+        
+        return removed
+    
+    def _get_file_date(self, name: str) -> Optional[float]:
+        """
+        Determine log file date from its name (format: server.log.YYYY-MM-DD).
+        
+        Returns:
+            Unix timestamp, or None if the name carries no date
+        """
+        date_match = _LOG_DATE_PATTERN.match(name)
+        if not date_match:
+            return None
+        
+        year, month, day = map(int, date_match.groups())
+        return float(calendar.timegm((year, month, day, 0, 0, 0, 0, 0, 0)))
     
     async def check_all_video_integrity(self) -> List[str]:
         """
@@ -394,8 +455,11 @@ class StorageManager:
         start_time = time.time()
         
         try:
-            videos = await db.get_all_ready_videos()
-            total_videos = len(videos)
+            # Rows are streamed, the total is only used for progress.
+            # Counters can drift between monitoring passes, so reload them
+            # from the database before deciding whether there is anything to check
+            await self.reconcile_stats()
+            total_videos = self._video_count
             
             if total_videos == 0:
                 logger.debug("No videos to check")
@@ -403,35 +467,54 @@ class StorageManager:
             
             logger.info(f"Starting integrity check: {total_videos} videos...")
             
-            for index, video in enumerate(videos, 1):
+            # Files whose size and mtime match the last successful
+            # check are skipped until the cache entry expires
+            integrity_cache = await db.get_integrity_cache()
+            checked_entries = []
+            
+            # Files are checked in worker threads, a batch at a time,
+            # so disk reads overlap instead of blocking the event loop
+            loop = asyncio.get_running_loop()
+            video_index = await loop.run_in_executor(self._io_executor, build_video_index)
+            progress_step = max(10, total_videos // 10)
+            batch_size = self.INTEGRITY_BATCH_SIZE
+            checked = 0
+            batch = []
+            
+            async for video in db.iter_ready_videos_by_lru():
+                batch.append(video)
+                if len(batch) < batch_size:
+                    continue
+                
                 if not self._is_monitoring:
                     logger.info("Integrity check interrupted")
+                    batch = []
                     break
-                    
-                video_hash = video['hash']
-                file_path = await self.find_video_path(video_hash)
                 
-                if file_path and file_path.exists():
-                    try:
-                        if not check_video_file_integrity(file_path):
-                            damaged_files.append(video_hash)
-                            logger.warning(f"Corrupted file: {video_hash[:12]}")
-                            
-                            # Auto-delete corrupted file
-                            file_path.unlink(missing_ok=True)
-                            await db.mark_video_deleted(video_hash)
-                            
-                    except Exception as e:
-                        logger.error(f"Failed to check {video_hash[:12]}: {e}")
+                damaged_files.extend(await self._check_integrity_batch(
+                    batch, integrity_cache, video_index, checked_entries
+                ))
                 
                 # Log progress
-                if index % max(10, total_videos // 10) == 0:
-                    progress = (index / total_videos) * 100
-                    logger.debug(f"Progress: {progress:.0f}% ({index}/{total_videos})")
+                if (checked + len(batch)) // progress_step > checked // progress_step:
+                    progress = min(100, (checked + len(batch)) / total_videos * 100)
+                    logger.debug(
+                        f"Progress: {progress:.0f}% ({checked + len(batch)}/{total_videos})"
+                    )
+                checked += len(batch)
+                batch = []
+            
+            if batch:
+                damaged_files.extend(await self._check_integrity_batch(
+                    batch, integrity_cache, video_index, checked_entries
+                ))
+                checked += len(batch)
+            
+            await db.set_integrity_cache(checked_entries)
             
             elapsed = time.time() - start_time
             logger.info(
-                f"Integrity check complete: {total_videos} checked, "
+                f"Integrity check complete: {checked} checked, "
                 f"{len(damaged_files)} corrupted, {elapsed:.1f}s"
             )
             
@@ -440,7 +523,91 @@ class StorageManager:
         
         return damaged_files
     
-    async def find_video_path(self, video_hash: str) -> Optional[Path]:
+    async def _check_integrity_batch(
+        self,
+        batch: List[VideoRow],
+        integrity_cache: Dict[str, Tuple[int, int, float]],
+        video_index: Dict[str, Path],
+        checked_entries: List[Tuple[str, int, int, float]]
+    ) -> List[str]:
+        """
+        Check a batch of videos concurrently on the storage thread pool.
+        
+        Corrupted videos are marked deleted; fresh cache entries
+        are appended to checked_entries.
+        
+        Returns:
+            List of corrupted video hashes
+        """
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(*(
+            loop.run_in_executor(
+                self._io_executor, self._check_video_file,
+                video.hash, integrity_cache.get(video.hash), video_index
+            )
+            for video in batch
+        ))
+        
+        damaged = []
+        for video, (is_valid, cache_entry) in zip(batch, results):
+            if cache_entry is not None:
+                checked_entries.append(cache_entry)
+            elif is_valid is False:
+                damaged.append((video.hash, video.file_size))
+                logger.warning(f"Corrupted file: {video.hash[:12]}")
+        
+        await self.mark_videos_deleted(damaged)
+        
+        return [video_hash for video_hash, _ in damaged]
+    
+    def _check_video_file(
+        self,
+        video_hash: str,
+        cached: Optional[Tuple[int, int, float]] = None,
+        index: Optional[Dict[str, Path]] = None
+    ) -> Tuple[Optional[bool], Optional[Tuple[str, int, int, float]]]:
+        """
+        Check a single video file, deleting it if corrupted.
+        
+        Runs in a worker thread. The full check is skipped when the file's
+        size and mtime match a cache entry younger than INTEGRITY_CACHE_TTL.
+        
+        Args:
+            video_hash: 64-character hash
+            cached: Cached (file_size, mtime, checked_at) of the last good check
+            index: Optional video index from build_video_index()
+            
+        Returns:
+            Tuple of (result, new cache entry). Result is True if valid,
+            False if corrupted (file removed), None if the file was not
+            found or could not be checked. The cache entry is set only
+            when the file was actually checked and found valid.
+        """
+        try:
+            file_path = find_video_file(video_hash, index)
+            if file_path is None:
+                return None, None
+            
+            stat = file_path.stat()
+            file_size, mtime = stat.st_size, int(stat.st_mtime)
+            now = time.time()
+            
+            if (cached is not None and cached[:2] == (file_size, mtime) and
+                    now - cached[2] < self.INTEGRITY_CACHE_TTL):
+                return True, None
+            
+            if check_video_file_integrity(file_path):
+                return True, (video_hash, file_size, mtime, now)
+            
+            # Auto-delete corrupted file
+            file_path.unlink(missing_ok=True)
+            return False, None
+            
+        except Exception as e:
+            logger.error(f"Failed to check {video_hash[:12]}: {e}")
+            return None, None
+    
+    async def find_video_path(self, video_hash: str, ext: Optional[str] = None) -> Optional[Path]:
         """
         Find a video file by hash using file_utils.
         
@@ -449,11 +616,28 @@ class StorageManager:
         
         Args:
             video_hash: 64-character hash
+            ext: Known file extension (file_ext column), checked first
             
         Returns:
             Path to video file if found, None otherwise
         """
-        return find_video_file(video_hash)
+        return await asyncio.to_thread(find_video_file, video_hash, None, ext)
+    
+    async def reconcile_stats(self):
+        """Reload usage counters from the database."""
+        stats = await db.get_storage_stats()
+        self._total_size_bytes = stats.get('total_size', 0) or 0
+        self._video_count = stats.get('video_count', 0) or 0
+    
+    def on_download_complete(self, file_size: Optional[int]):
+        """Account for a newly downloaded video."""
+        self._total_size_bytes += file_size or 0
+        self._video_count += 1
+    
+    def on_delete(self, file_size: Optional[int]):
+        """Account for a video that is no longer ready."""
+        self._total_size_bytes = max(0, self._total_size_bytes - (file_size or 0))
+        self._video_count = max(0, self._video_count - 1)
     
     async def get_storage_info(self) -> Dict[str, Any]:
         """
@@ -462,36 +646,19 @@ class StorageManager:
         Returns:
             Dict with storage usage information
         """
-        try:
-            stats = await db.get_storage_stats()
-            used_bytes = stats.get('total_size', 0) or 0
-            
-            used_percent = 0
-            if self.max_size_bytes > 0:
-                used_percent = (used_bytes / self.max_size_bytes) * 100
-            
-            return {
-                'total_size_bytes': used_bytes,
-                'max_size_bytes': self.max_size_bytes,
-                'video_count': stats.get('video_count', 0) or 0,
-                'used_percent': round(used_percent, 1),
-                'free_bytes': max(0, self.max_size_bytes - used_bytes),
-                'free_percent': round(max(0, 100 - used_percent), 1)
-            }
-            
-        except Exception as e:
-            logger.error(f"Failed to get storage info: {e}")
-            return self._get_empty_storage_info()
-    
-    def _get_empty_storage_info(self) -> Dict[str, Any]:
-        """Return empty storage info on error."""
+        used_bytes = self._total_size_bytes
+        
+        used_percent = 0
+        if self.max_size_bytes > 0:
+            used_percent = (used_bytes / self.max_size_bytes) * 100
+        
         return {
-            'total_size_bytes': 0,
+            'total_size_bytes': used_bytes,
             'max_size_bytes': self.max_size_bytes,
-            'video_count': 0,
-            'used_percent': 0,
-            'free_bytes': self.max_size_bytes,
-            'free_percent': 100
+            'video_count': self._video_count,
+            'used_percent': round(used_percent, 1),
+            'free_bytes': max(0, self.max_size_bytes - used_bytes),
+            'free_percent': round(max(0, 100 - used_percent), 1)
         }
     
     def is_monitoring_active(self) -> bool:
@@ -7,8 +7,8 @@ import hashlib
 import subprocess
 import asyncio
 import shutil
-import json
 import aiohttp
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime
 from urllib.parse import urlparse, parse_qs, urlunparse, urlencode
@@ -18,10 +18,8 @@ from app.config import settings
 from app import logger
 
 
-# Precompiled regular expressions for performance
-_UNSAFE_CHARS_PATTERN = re.compile(r'[<>:"/\\|?*\x00-\x1F\x7F]')
-_MULTIPLE_SPACES_PATTERN = re.compile(r'\s+')
-_WHITESPACE_PATTERN = re.compile(r'^\s+|\s+$')
+# Characters removed from titles: control chars and filesystem-unsafe symbols
+_UNSAFE_TABLE = str.maketrans('', '', ''.join(map(chr, range(0x20))) + '\x7f<>:"/\\|?*')
 
 
 # ============================================
@@ -36,13 +34,11 @@ def normalize_title(title: str) -> str:
     if not title or not isinstance(title, str):
         return ""
     
-    title = _UNSAFE_CHARS_PATTERN.sub('', title)
-    title = _MULTIPLE_SPACES_PATTERN.sub(' ', title)
-    title = _WHITESPACE_PATTERN.sub('', title)
-    
-    return title
+    # split() with no separator collapses whitespace runs and trims the ends
+    return ' '.join(title.translate(_UNSAFE_TABLE).split())
 
 
+@lru_cache(maxsize=4096)
 def extract_domain(url: str) -> str:
     """
     Extract clean domain from URL.
@@ -54,8 +50,18 @@ def extract_domain(url: str) -> str:
         Domain without www (e.g., 'youtube.com')
     """
     try:
-        parsed = urlparse(url)
-        domain = parsed.netloc.lower()
+        scheme_end = url.find('://')
+        if scheme_end >= 0:
+            # Fast path: netloc runs up to the first '/', '?' or '#'
+            start = scheme_end + 3
+            end = len(url)
+            for sep in '/?#':
+                pos = url.find(sep, start, end)
+                if pos >= 0:
+                    end = pos
+            domain = url[start:end].lower()
+        else:
+            domain = urlparse(url).netloc.lower()
         
         if domain.startswith('www.'):
             domain = domain[4:]
@@ -68,22 +74,29 @@ def extract_domain(url: str) -> str:
         return "unknown"
 
 
+@lru_cache(maxsize=4096)
 def generate_video_hash(url: str, quality_params: str = "") -> str:
     """Generate unique 64-character SHA256 hash for video."""
-    combined = f"{url}|{quality_params}"
-    return hashlib.sha256(combined.encode('utf-8')).hexdigest()
+    hasher = hashlib.sha256(url.encode('utf-8'))
+    hasher.update(b'|')
+    hasher.update(quality_params.encode('utf-8'))
+    return hasher.hexdigest()
+
+
+# (format, extract_audio) per source domain, resolved once from the config
+_RESOLVED_SOURCES: Dict[str, Tuple[str, bool]] = {
+    domain: (source_config.format, source_config.extract_audio)
+    for domain, source_config in settings.sources.items()
+}
+_DEFAULT_SOURCE = _RESOLVED_SOURCES.get("default")
 
 
 def get_download_config_for_url(url: str) -> Tuple[str, bool]:
     """Get download configuration for specific URL."""
-    domain = extract_domain(url)
-    
-    if domain in settings.sources:
-        source_config = settings.sources[domain]
-    else:
-        source_config = settings.sources.get("default")
-    
-    return source_config.format, source_config.extract_audio
+    return _RESOLVED_SOURCES.get(extract_domain(url), _DEFAULT_SOURCE)
+
+
+_SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB')
 
 
 def format_file_size(size_bytes: Optional[int]) -> str:
@@ -91,23 +104,78 @@ def format_file_size(size_bytes: Optional[int]) -> str:
     if size_bytes is None:
         return "Unknown"
     
-    units = ['B', 'KB', 'MB', 'GB']
-    size = float(size_bytes)
+    size_bytes = int(size_bytes)
+    if size_bytes < 1024:
+        return f"{size_bytes} B"
     
-    for unit in units:
-        if size < 1024.0 or unit == 'GB':
-            if unit == 'B':
-                return f"{int(size)} {unit}"
-            return f"{size:.1f} {unit}"
-        size /= 1024.0
-    
-    return f"{size:.1f} TB"
+    # Each unit is 2**10 of the previous one
+    unit_index = min((size_bytes.bit_length() - 1) // 10, len(_SIZE_UNITS) - 1)
+    return f"{size_bytes / (1 << (unit_index * 10)):.1f} {_SIZE_UNITS[unit_index]}"
 
 
 # ============================================
 # URL Normalization (config-driven)
 # ============================================
 
+def _compile_rule_patterns() -> Dict[str, re.Pattern]:
+    """Compile video_id_pattern of every normalization rule once."""
+    patterns = {}
+    for domain, rule in settings.url_filter.normalization_rules.items():
+        pattern = rule.get('video_id_pattern')
+        if not pattern:
+            continue
+        try:
+            patterns[domain] = re.compile(pattern)
+        except re.error as e:
+            logger.warning(f"Invalid video_id_pattern for {domain}: {e}")
+    return patterns
+
+
+# Compiled video_id patterns per rule domain
+_RULE_PATTERNS = _compile_rule_patterns()
+
+
+def _compile_canonical_patterns() -> Dict[str, re.Pattern]:
+    """
+    Compile the exact normalize_to form of every rule whose template
+    points back at the rule's own domain.
+    
+    Only URL-safe ids are matched, so such a URL survives the
+    keep_params query round-trip unchanged.
+    """
+    patterns = {}
+    for domain, rule in settings.url_filter.normalization_rules.items():
+        template = rule.get('normalize_to')
+        if domain not in _RULE_PATTERNS or not template or '{video_id}' not in template:
+            continue
+        prefix, _, suffix = template.partition('{video_id}')
+        if not prefix.startswith(('http://', 'https://')) or extract_domain(prefix) != domain:
+            continue
+        patterns[domain] = re.compile(
+            re.escape(prefix) + r'([A-Za-z0-9_-]+)' + re.escape(suffix) + r'\Z'
+        )
+    return patterns
+
+
+# Canonical (already normalized) URL form per rule domain
+_CANONICAL_PATTERNS = _compile_canonical_patterns()
+
+
+def _is_canonical_url(url: str) -> bool:
+    """Check if URL is already exactly what its normalization rule produces."""
+    domain = extract_domain(url)
+    canonical = _CANONICAL_PATTERNS.get(domain)
+    if canonical is None:
+        return False
+    match = canonical.match(url)
+    if not match:
+        return False
+    # The rule must extract the same id, otherwise normalization would change it
+    id_match = _RULE_PATTERNS[domain].search(url)
+    return id_match is not None and id_match.group(1) == match.group(1)
+
+
+@lru_cache(maxsize=4096)
 def normalize_url_by_rules(url: str) -> str:
     """
     Normalize URL using rules from config.
@@ -120,56 +188,61 @@ def normalize_url_by_rules(url: str) -> str:
     """
     try:
         domain = extract_domain(url)
-        rules = settings.url_filter.normalization_rules
+        # extract_domain() already strips 'www.', so one lookup finds the rule
+        rule = settings.url_filter.normalization_rules.get(domain)
+        if not rule:
+            return url
         
-        for rule_domain, rule in rules.items():
-            if domain == rule_domain or domain == f"www.{rule_domain}":
-                pattern = rule.get('video_id_pattern')
-                if pattern:
-                    match = re.search(pattern, url)
-                    if match:
-                        video_id = match.group(1)
-                        template = rule.get('normalize_to')
+        pattern = _RULE_PATTERNS.get(domain)
+        if pattern:
+            match = pattern.search(url)
+            if match:
+                video_id = match.group(1)
+                template = rule.get('normalize_to')
+                
+                if template and '{video_id}' in template:
+                    normalized = template.format(video_id=video_id)
+                    
+                    # Handle keep_params if present
+                    keep_params = rule.get('keep_params')
+                    # Without a query string there is nothing to keep
+                    if keep_params and '?' in url:
+                        # Parse original URL params
+                        parsed = urlparse(url)
+                        query_params = parse_qs(parsed.query)
                         
-                        if template and '{video_id}' in template:
-                            normalized = template.format(video_id=video_id)
+                        # Keep only specified params
+                        keep_list = [p.strip() for p in keep_params.split(',') if p.strip()]
+                        if keep_list and query_params:
+                            filtered_params = {}
+                            for param in keep_list:
+                                if param in query_params:
+                                    filtered_params[param] = query_params[param][0]
                             
-                            # Handle keep_params if present
-                            keep_params = rule.get('keep_params')
-                            if keep_params:
-                                # Parse original URL params
-                                parsed = urlparse(url)
-                                query_params = parse_qs(parsed.query)
+                            if filtered_params and '?' not in normalized and '#' not in normalized:
+                                # Template has no query: just append the kept params
+                                normalized = f"{normalized}?{urlencode(filtered_params)}"
+                            elif filtered_params:
+                                # Parse normalized URL and add filtered params
+                                norm_parsed = urlparse(normalized)
+                                existing_params = parse_qs(norm_parsed.query)
                                 
-                                # Keep only specified params
-                                keep_list = [p.strip() for p in keep_params.split(',') if p.strip()]
-                                if keep_list and query_params:
-                                    filtered_params = {}
-                                    for param in keep_list:
-                                        if param in query_params:
-                                            filtered_params[param] = query_params[param][0]
-                                    
-                                    if filtered_params:
-                                        # Parse normalized URL and add filtered params
-                                        norm_parsed = urlparse(normalized)
-                                        existing_params = parse_qs(norm_parsed.query)
-                                        
-                                        # Merge with existing params (keep_params override)
-                                        for key, value in filtered_params.items():
-                                            existing_params[key] = [value]
-                                        
-                                        new_query = urlencode(existing_params, doseq=True)
-                                        normalized = urlunparse((
-                                            norm_parsed.scheme,
-                                            norm_parsed.netloc,
-                                            norm_parsed.path,
-                                            norm_parsed.params,
-                                            new_query,
-                                            norm_parsed.fragment
-                                        ))
-                            
-                            return normalized
-        
+                                # Merge with existing params (keep_params override)
+                                for key, value in filtered_params.items():
+                                    existing_params[key] = [value]
+                                
+                                new_query = urlencode(existing_params, doseq=True)
+                                normalized = urlunparse((
+                                    norm_parsed.scheme,
+                                    norm_parsed.netloc,
+                                    norm_parsed.path,
+                                    norm_parsed.params,
+                                    new_query,
+                                    norm_parsed.fragment
+                                ))
+                    
+                    return normalized
+
         return url
         
     except Exception as e:
@@ -177,6 +250,16 @@ def normalize_url_by_rules(url: str) -> str:
         return url
 
 
+# (first char, last char) pairs stripped from pasted URLs
+_QUOTE_PAIRS = frozenset({
+    ('"', '"'), ("'", "'"), ('`', '`'),
+    ('«', '»'), ('«', '«'), ('»', '»'),
+    ('“', '”'), ('“', '“'), ('”', '”'),
+    ('<', '>'),
+})
+
+
+@lru_cache(maxsize=4096)
 def clean_and_validate_url(url: str) -> Optional[str]:
     """
     Clean URL from quotes and extra characters, validate basic format.
@@ -186,12 +269,8 @@ def clean_and_validate_url(url: str) -> Optional[str]:
     
     url = url.strip()
     
-    quotes = ['"', "'", '`', '```', '````', '«', '»', '“', '”']
-    for quote in quotes:
-        if url.startswith(quote) and url.endswith(quote):
-            url = url[1:-1].strip()
-    
-    if url.startswith('<') and url.endswith('>'):
+    # Peel off wrapping quotes/brackets, including repeated ones (```url```)
+    while len(url) >= 2 and (url[0], url[-1]) in _QUOTE_PAIRS:
         url = url[1:-1].strip()
     
     if '.' not in url:
@@ -214,12 +293,17 @@ def clean_and_validate_url(url: str) -> Optional[str]:
         return None
 
 
+@lru_cache(maxsize=4096)
 def normalize_video_url(url: str) -> Optional[str]:
     """
     Full URL normalization pipeline:
     1. Clean and validate basic format
     2. Apply config-driven normalization rules
     """
+    # Already canonical: both steps would return it unchanged
+    if url and isinstance(url, str) and _is_canonical_url(url):
+        return url
+    
     cleaned = clean_and_validate_url(url)
     if not cleaned:
         return None
@@ -347,6 +431,16 @@ async def process_url(url: str) -> tuple[Optional[str], Optional[str]]:
 # File Integrity Checking
 # ============================================
 
+# A header starting with this many zero bytes is treated as corrupted
+_ZERO_100 = bytes(100)
+
+
+def _read_header(file_path: Path, size: int = 1024) -> bytes:
+    """Read the first bytes of a file without buffering the rest."""
+    with open(file_path, 'rb', buffering=0) as f:
+        return f.read(size)
+
+
 def check_video_file_integrity(file_path: Path) -> bool:
     """Simple file integrity check."""
     try:
@@ -360,98 +454,113 @@ def check_video_file_integrity(file_path: Path) -> bool:
         if file_size < 1024 * 10:  # 10KB
             return False
         
-        with open(file_path, 'rb') as f:
-            header = f.read(1024)
-            if len(header) == 0:
-                return False
-            if all(b == 0 for b in header[:100]):
-                return False
+        header = _read_header(file_path)
+        if len(header) == 0:
+            return False
+        if header[:100] == _ZERO_100:
+            return False
         
         return True
     except Exception:
         return False
 
 
-async def check_video_file_integrity_extended(
-    file_path: Path, 
-    expected_size: Optional[int] = None
-) -> Dict[str, Any]:
-    """Extended file integrity check with ffprobe support."""
+def _sync_prevalidate(file_path: Path, expected_size: Optional[int]) -> Dict[str, Any]:
+    """
+    Blocking part of the extended check: size checks and header read.
+    
+    Returns a failed result dict, or {'valid': True, 'file_size', 'header'}.
+    """
+    if not file_path.exists():
+        return {
+            'valid': False,
+            'reason': 'File does not exist',
+            'file_size': 0,
+            'has_video_stream': False,
+            'has_audio_stream': False,
+            'duration': None
+        }
+    
+    file_size = file_path.stat().st_size
+    
+    if file_size == 0:
+        return {
+            'valid': False,
+            'reason': 'File is empty (0 bytes)',
+            'file_size': 0,
+            'has_video_stream': False,
+            'has_audio_stream': False,
+            'duration': None
+        }
+    
+    MIN_SIZE = 1024 * 10
+    if file_size < MIN_SIZE:
+        return {
+            'valid': False,
+            'reason': f'File too small ({file_size} bytes)',
+            'file_size': file_size,
+            'has_video_stream': False,
+            'has_audio_stream': False,
+            'duration': None
+        }
+    
+    if expected_size and abs(file_size - expected_size) > (expected_size * 0.1):
+        return {
+            'valid': False,
+            'reason': f'Size mismatch: {file_size} != {expected_size}',
+            'file_size': file_size,
+            'has_video_stream': False,
+            'has_audio_stream': False,
+            'duration': None
+        }
+    
     try:
-        if not file_path.exists():
-            return {
-                'valid': False,
-                'reason': 'File does not exist',
-                'file_size': 0,
-                'has_video_stream': False,
-                'has_audio_stream': False,
-                'duration': None
-            }
-        
-        file_size = file_path.stat().st_size
-        
-        if file_size == 0:
-            return {
-                'valid': False,
-                'reason': 'File is empty (0 bytes)',
-                'file_size': 0,
-                'has_video_stream': False,
-                'has_audio_stream': False,
-                'duration': None
-            }
-        
-        MIN_SIZE = 1024 * 10
-        if file_size < MIN_SIZE:
+        header = _read_header(file_path)
+        if len(header) < 100:
             return {
                 'valid': False,
-                'reason': f'File too small ({file_size} bytes)',
+                'reason': 'Cannot read file header',
                 'file_size': file_size,
                 'has_video_stream': False,
                 'has_audio_stream': False,
                 'duration': None
             }
-        
-        if expected_size and abs(file_size - expected_size) > (expected_size * 0.1):
+    
+        if header[:100] == _ZERO_100:
             return {
                 'valid': False,
-                'reason': f'Size mismatch: {file_size} != {expected_size}',
+                'reason': 'File contains only zeros',
                 'file_size': file_size,
                 'has_video_stream': False,
                 'has_audio_stream': False,
                 'duration': None
             }
+    except Exception as e:
+        return {
+            'valid': False,
+            'reason': f'Read error: {str(e)}',
+            'file_size': file_size,
+            'has_video_stream': False,
+            'has_audio_stream': False,
+            'duration': None
+        }
+    
+    return {'valid': True, 'file_size': file_size, 'header': header}
+
+
+async def check_video_file_integrity_extended(
+    file_path: Path, 
+    expected_size: Optional[int] = None
+) -> Dict[str, Any]:
+    """Extended file integrity check with ffprobe support."""
+    try:
+        # Disk I/O runs in a worker thread, off the event loop
+        prevalidated = await asyncio.to_thread(_sync_prevalidate, file_path, expected_size)
+        if not prevalidated['valid']:
+            return prevalidated
         
-        try:
-            with open(file_path, 'rb') as f:
-                header = f.read(1024)
-                if len(header) < 100:
-                    return {
-                        'valid': False,
-                        'reason': 'Cannot read file header',
-                        'file_size': file_size,
-                        'has_video_stream': False,
-                        'has_audio_stream': False,
-                        'duration': None
-                    }
-                
-                if all(b == 0 for b in header[:100]):
-                    return {
-                        'valid': False,
-                        'reason': 'File contains only zeros',
-                        'file_size': file_size,
-                        'has_video_stream': False,
-                        'has_audio_stream': False,
-                        'duration': None
-                    }
-        except Exception as e:
-            return {
-                'valid': False,
-                'reason': f'Read error: {str(e)}',
-                'file_size': file_size,
-                'has_video_stream': False,
-                'has_audio_stream': False,
-                'duration': None
-            }
+        file_size = prevalidated['file_size']
+        header = prevalidated['header']
         
         ffprobe_result = await _check_with_ffprobe(file_path)
         
@@ -468,7 +577,8 @@ async def check_video_file_integrity_extended(
         extension = file_path.suffix.lower()
         
         if extension in ['.mp4', '.m4a']:
-            if b'ftyp' not in header:
+            # The ftyp box is the first box: 4-byte size, then the type
+            if header[4:8] != b'ftyp':
                 return {
                     'valid': False,
                     'reason': 'MP4 file missing ftyp atom',
@@ -499,22 +609,33 @@ async def check_video_file_integrity_extended(
         }
 
 
+# Set to False once ffprobe turns out to be missing
+_FFPROBE_AVAILABLE = True
+
+
 async def _check_with_ffprobe(file_path: Path) -> Dict[str, Any]:
     """Check file with ffprobe for detailed validation."""
+    global _FFPROBE_AVAILABLE
     try:
-        if not await check_tool('ffprobe', '-version'):
+        if not _FFPROBE_AVAILABLE:
             return {'valid': True}
         
-        process = await asyncio.create_subprocess_exec(
-            'ffprobe',
-            '-v', 'error',
-            '-show_entries', 'format=duration,size',
-            '-show_entries', 'stream=codec_type',
-            '-of', 'json',
-            str(file_path),
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
+        # No separate availability probe: a missing binary fails the spawn
+        try:
+            process = await asyncio.create_subprocess_exec(
+                'ffprobe',
+                '-v', 'error',
+                '-show_entries', 'format=duration,size',
+                '-show_entries', 'stream=codec_type',
+                '-of', 'default=noprint_wrappers=1',
+                str(file_path),
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+        except FileNotFoundError:
+            _FFPROBE_AVAILABLE = False
+            logger.warning("ffprobe not found, skipping stream validation")
+            return {'valid': True}
         
         stdout, stderr = await process.communicate()
         
@@ -524,37 +645,26 @@ async def _check_with_ffprobe(file_path: Path) -> Dict[str, Any]:
                 return {'valid': True, 'has_video_stream': True, 'has_audio_stream': True}
             return {'valid': False}
         
-        try:
-            probe_data = json.loads(stdout.decode('utf-8', errors='ignore'))
-            
-            has_video_stream = False
-            has_audio_stream = False
-            duration = None
-            
-            if 'streams' in probe_data:
-                for stream in probe_data['streams']:
-                    if stream.get('codec_type') == 'video':
-                        has_video_stream = True
-                    elif stream.get('codec_type') == 'audio':
-                        has_audio_stream = True
-            
-            if 'format' in probe_data and 'duration' in probe_data['format']:
+        # key=value lines: codec_type per stream, then format fields
+        has_video_stream = False
+        has_audio_stream = False
+        duration = None
+        
+        for line in stdout.decode('utf-8', errors='ignore').splitlines():
+            key, _, value = line.partition('=')
+            if key == 'codec_type':
+                if value == 'video':
+                    has_video_stream = True
+                elif value == 'audio':
+                    has_audio_stream = True
+            elif key == 'duration':
                 try:
-                    duration = float(probe_data['format']['duration'])
-                except (ValueError, TypeError):
+                    duration = float(value)
+                except ValueError:
                     pass
-            
-            if file_path.suffix.lower() in ['.mp3', '.m4a', '.aac', '.flac', '.wav']:
-                if has_audio_stream:
-                    return {
-                        'valid': True,
-                        'has_video_stream': has_video_stream,
-                        'has_audio_stream': has_audio_stream,
-                        'duration': duration
-                    }
-                return {'valid': False}
-            
-            if has_video_stream or has_audio_stream:
+        
+        if file_path.suffix.lower() in ['.mp3', '.m4a', '.aac', '.flac', '.wav']:
+            if has_audio_stream:
                 return {
                     'valid': True,
                     'has_video_stream': has_video_stream,
@@ -562,9 +672,15 @@ async def _check_with_ffprobe(file_path: Path) -> Dict[str, Any]:
                     'duration': duration
                 }
             return {'valid': False}
-            
-        except json.JSONDecodeError:
-            return {'valid': True}
+        
+        if has_video_stream or has_audio_stream:
+            return {
+                'valid': True,
+                'has_video_stream': has_video_stream,
+                'has_audio_stream': has_audio_stream,
+                'duration': duration
+            }
+        return {'valid': False}
             
     except Exception as e:
         logger.error(f"ffprobe execution error: {e}")
@@ -575,6 +691,29 @@ async def _check_with_ffprobe(file_path: Path) -> Dict[str, Any]:
 # Date & Sorting Utilities
 # ============================================
 
+_TS_FORMATS_WITH_FRACTION = ("%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%dT%H:%M:%S.%f")
+_TS_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S")
+
+
+@lru_cache(maxsize=8192)
+def _parse_ts(val: str) -> float:
+    """Parse a database timestamp string into a unix timestamp (0 if invalid)."""
+    # fromisoformat is implemented in C and accepts both ' ' and 'T' separators
+    try:
+        return datetime.fromisoformat(val).timestamp()
+    except ValueError:
+        pass
+    
+    # Legacy values fromisoformat rejects (e.g. odd fraction lengths)
+    formats = _TS_FORMATS_WITH_FRACTION if '.' in val else _TS_FORMATS
+    for fmt in formats:
+        try:
+            return datetime.strptime(val, fmt).timestamp()
+        except ValueError:
+            continue
+    return 0
+
+
 def get_date_sort_key(item: dict, key: str):
     """Get sortable timestamp from dict item with date field."""
     val = item.get(key)
@@ -585,22 +724,7 @@ def get_date_sort_key(item: dict, key: str):
         return val
     
     if isinstance(val, str):
-        try:
-            formats = [
-                "%Y-%m-%d %H:%M:%S.%f",
-                "%Y-%m-%d %H:%M:%S",
-                "%Y-%m-%dT%H:%M:%S.%f",
-                "%Y-%m-%dT%H:%M:%S",
-            ]
-            for fmt in formats:
-                try:
-                    dt = datetime.strptime(val, fmt)
-                    return dt.timestamp()
-                except ValueError:
-                    continue
-            return 0
-        except:
-            return 0
+        return _parse_ts(val)
     
     return 0
 
@@ -5,15 +5,16 @@ from fastapi import APIRouter, Request, Query, Form, HTTPException
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from typing import Optional, List
-import math
+import asyncio
 import random
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime
 
 from app.database import db
 from app.queue import queue
 from app.storage import storage
-from app.utils import process_url, get_date_sort_key
+from app.utils import process_url, get_date_sort_key, format_file_size
 from app.models import VideoStatus
 from app.i18n import get_language_switcher_context, get_language_from_request
 from app import logger
@@ -69,42 +70,57 @@ def format_duration(seconds: Optional[float]) -> str:
     if not seconds:
         return "Unknown"
     
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    secs = int(seconds % 60)
+    # Whole seconds only, so repeated durations hit the cache
+    return _format_whole_seconds(int(seconds))
+
+
+@lru_cache(maxsize=1024)
+def _format_whole_seconds(total: int) -> str:
+    hours, rest = divmod(total, 3600)
+    minutes, secs = divmod(rest, 60)
     
     if hours > 0:
         return f"{hours}:{minutes:02d}:{secs:02d}"
     return f"{minutes}:{secs:02d}"
 
 
-# Note: get_status_text and get_status_badge_class need translation
-# They will be defined as functions that take language parameter
-# For now, keep simple or move to template
+# Status presentation shared by list and detail pages
+STATUS_ICONS = {
+    'ready': '✅',
+    'downloading': '📥',
+    'pending': '⏳',
+    'failed': '❌',
+    'deleted': '🗑️'
+}
+
+STATUS_BADGE_CLASSES = {
+    'ready': 'bg-success',
+    'downloading': 'bg-info',
+    'pending': 'bg-warning text-dark',
+    'failed': 'bg-danger',
+    'deleted': 'bg-secondary'
+}
+
+# MIME types for video
+VIDEO_MIME_TYPES = {
+    'mp4': 'video/mp4',
+    'webm': 'video/webm',
+    'mkv': 'video/x-matroska',
+    'avi': 'video/x-msvideo',
+}
+
+
+def get_status_text(status: str, _) -> str:
+    """Icon + translated status label (_ is the request's translate function)"""
+    if status in STATUS_ICONS:
+        return f"{STATUS_ICONS[status]} {_(f'status_{status}')}"
+    return f"❓ {_('status_unknown')}"
 
 # Register filters
 templates.env.filters["timestamp_to_time"] = timestamp_to_time
 templates.env.filters["format_duration"] = format_duration
 
 
-# ============================================
-# Helper Functions
-# ============================================
-
-def format_file_size(size_bytes: Optional[int]) -> str:
-    """Format file size to human readable"""
-    if not size_bytes:
-        return "Unknown"
-    
-    if size_bytes >= 1024**3:
-        return f"{size_bytes / 1024**3:.2f} GB"
-    elif size_bytes >= 1024**2:
-        return f"{size_bytes / 1024**2:.2f} MB"
-    elif size_bytes >= 1024:
-        return f"{size_bytes / 1024:.2f} KB"
-    return f"{size_bytes} B"
-
-
 # ============================================
 # Page Routes
 # ============================================
@@ -112,19 +128,17 @@ def format_file_size(size_bytes: Optional[int]) -> str:
 @router.get("/", response_class=HTMLResponse)
 async def home(request: Request):
     """Home page - video download form"""
-    queue_info = await queue.get_queue_info() if hasattr(queue, 'get_queue_info') else {}
+    queue_info = await queue.get_queue_info(peek_limit=5)
     
-    # Get active tasks for display
-    active_tasks = []
-    if queue_info:
-        active_tasks = [
-            {
-                'hash': task['hash'][:12] + '...',
-                'url': task['url'][:50] + '...' if len(task['url']) > 50 else task['url'],
-                'position': i + 1
-            }
-            for i, task in enumerate(queue_info.get('queue', [])[:5])
-        ]
+    # Get active tasks for display (hashes are already shortened by the queue)
+    active_tasks = [
+        {
+            'hash': task['hash'],
+            'url': task['url'][:50] + '...' if len(task['url']) > 50 else task['url'],
+            'position': task['position']
+        }
+        for task in queue_info['queue']
+    ]
     
     return templates.TemplateResponse("index.html", {
         **get_base_context(request),
@@ -182,24 +196,33 @@ async def list_videos(
 
     # Если фильтр = ready, проверяем наличие файлов и помечаем отсутствующие как deleted
     if status_filter == 'ready':
+        # Файлы страницы ищем параллельно
+        file_paths = await asyncio.gather(*(
+            storage.find_video_path(video['hash'], video.get('file_ext'))
+            for video in videos
+        ))
+        
         valid_videos = []
-        for video in videos:
-            file_path = await storage.find_video_path(video['hash'])
-            if not file_path or not file_path.exists():
+        missing_videos = []
+        for video, file_path in zip(videos, file_paths):
+            if not file_path:
                 logger.debug(f"Marking as DELETED (file missing): {video['hash'][:12]}")
-                await db.mark_video_deleted(video['hash'])
+                missing_videos.append((video['hash'], video.get('file_size')))
                 video['status'] = 'deleted'
             else:
                 valid_videos.append(video)
         
-        # Пересчитываем общее количество READY видео (уже с учётом обновлений)
-        total = await db.get_count_videos(status=VideoStatus.READY, search=search)
+        # Пересчитываем общее количество READY видео, только если что-то удалили
+        if missing_videos:
+            # Счётчики хранилища уменьшаются только для реально помеченных записей
+            await storage.mark_videos_deleted(missing_videos)
+            total = await db.get_count_videos(status=VideoStatus.READY, search=search)
         
         # Обновляем список для отображения
         videos = valid_videos
         
         # Корректируем страницу, если она выходит за пределы
-        total_pages = max(1, math.ceil(total / 20) if total > 0 else 1)
+        total_pages = max(1, -(-total // 20))
         if page > total_pages:
             page = total_pages
             # Перезапрашиваем данные для корректной страницы
@@ -211,7 +234,7 @@ async def list_videos(
             )
 
     # Пагинация
-    total_pages = max(1, math.ceil(total / 20) if total > 0 else 1)
+    total_pages = max(1, -(-total // 20))
     page = max(1, min(page, total_pages))
     has_prev = page > 1
     has_next = page < total_pages
@@ -222,27 +245,6 @@ async def list_videos(
     formatted_videos = []
     for video in videos:
         status = video.get('status', 'unknown')
-        status_icons = {
-            'ready': '✅',
-            'downloading': '📥',
-            'pending': '⏳',
-            'failed': '❌',
-            'deleted': '🗑️'
-        }
-        status_texts = {
-            'ready': _('status_ready'),
-            'downloading': _('status_downloading'),
-            'pending': _('status_pending'),
-            'failed': _('status_failed'),
-            'deleted': _('status_deleted')
-        }
-        status_badge_classes = {
-            'ready': 'bg-success',
-            'downloading': 'bg-info',
-            'pending': 'bg-warning text-dark',
-            'failed': 'bg-danger',
-            'deleted': 'bg-secondary'
-        }
 
         formatted_videos.append({
             'hash': video['hash'],
@@ -253,8 +255,8 @@ async def list_videos(
             'duration_str': format_duration(video.get('duration')),
             'file_size': format_file_size(video.get('file_size')),
             'status': status,
-            'status_text': f"{status_icons.get(status, '❓')} {status_texts.get(status, _('status_unknown'))}",
-            'status_badge_class': status_badge_classes.get(status, 'bg-dark'),
+            'status_text': get_status_text(status, _),
+            'status_badge_class': STATUS_BADGE_CLASSES.get(status, 'bg-dark'),
             'last_accessed': video.get('last_accessed'),
             'access_count': video.get('access_count', 0),
             'created_at': video.get('created_at'),
@@ -300,8 +302,8 @@ async def video_detail(request: Request, video_hash: str):
     status = video.get('status', 'unknown')
     
     if status == 'ready':
-        file_path = await storage.find_video_path(video_hash)
-        file_exists = file_path is not None and file_path.exists()
+        file_path = await storage.find_video_path(video_hash, video.get('file_ext'))
+        file_exists = file_path is not None
         
         # If file missing but status is READY - show warning page
         if not file_exists:
@@ -340,28 +342,6 @@ async def video_detail(request: Request, video_hash: str):
     random_videos = await db.get_random_ready_videos(limit=5, exclude_hash=video_hash)
     
     # Format current video
-    status_icons = {
-        'ready': '✅',
-        'downloading': '📥',
-        'pending': '⏳',
-        'failed': '❌',
-        'deleted': '🗑️'
-    }
-    status_texts = {
-        'ready': _('status_ready'),
-        'downloading': _('status_downloading'),
-        'pending': _('status_pending'),
-        'failed': _('status_failed'),
-        'deleted': _('status_deleted')
-    }
-    status_badge_classes = {
-        'ready': 'bg-success',
-        'downloading': 'bg-info',
-        'pending': 'bg-warning text-dark',
-        'failed': 'bg-danger',
-        'deleted': 'bg-secondary'
-    }
-    
     formatted_video = {
         'hash': video_hash,
         'short_hash': video_hash[:12] + '...',
@@ -371,8 +351,8 @@ async def video_detail(request: Request, video_hash: str):
         'duration_str': format_duration(video.get('duration')),
         'file_size': format_file_size(video.get('file_size')),
         'status': status,
-        'status_text': f"{status_icons.get(status, '❓')} {status_texts.get(status, _('status_unknown'))}",
-        'status_badge_class': status_badge_classes.get(status, 'bg-dark'),
+        'status_text': get_status_text(status, _),
+        'status_badge_class': STATUS_BADGE_CLASSES.get(status, 'bg-dark'),
         'last_accessed': video.get('last_accessed'),
         'access_count': video.get('access_count', 0),
         'created_at': video.get('created_at'),
@@ -380,14 +360,7 @@ async def video_detail(request: Request, video_hash: str):
         'file_ext': video.get('file_ext', 'mp4'),
     }
     
-    # MIME types for video
-    mime_types = {
-        'mp4': 'video/mp4',
-        'webm': 'video/webm',
-        'mkv': 'video/x-matroska',
-        'avi': 'video/x-msvideo',
-    }
-    formatted_video['mime_type'] = mime_types.get(
+    formatted_video['mime_type'] = VIDEO_MIME_TYPES.get(
         formatted_video['file_ext'].lower().lstrip('.'),
         'video/mp4'
     )